@@ -0,0 +1,49 @@
+"""Add pgvector HNSW indexes for similarity search
+
+Revision ID: 7c1e9a4d2b60
+Revises: 242b6d41c77c
+Create Date: 2026-10-17 12:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e9a4d2b60'
+down_revision = '242b6d41c77c'
+branch_labels = None
+depends_on = None
+
+# (index name, table, vector column); partial on is_active because every
+# similarity query only considers active rows
+VECTOR_INDEXES = [
+    ('idx_candidate_vector_hnsw', 'candidates', 'candidate_vector'),
+    ('idx_user_vector_hnsw', 'users', 'user_vector'),
+    ('idx_project_vector_hnsw', 'projects', 'project_vector'),
+]
+
+
+def upgrade() -> None:
+    # SQLite keeps using the in-process indexes
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS vector')
+    for name, table, column in VECTOR_INDEXES:
+        op.create_index(
+            name,
+            table,
+            [column],
+            unique=False,
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={column: 'vector_cosine_ops'},
+            postgresql_where=sa.text('is_active'),
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, table, _ in VECTOR_INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,50 @@
+"""Rewrite stored skills, languages and frameworks to canonical names
+
+Revision ID: a8d4f2c6e0b3
+Revises: f1c3e5a7b9d2
+Create Date: 2026-10-17 19:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.skills import canonical_skills
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d4f2c6e0b3'
+down_revision = 'f1c3e5a7b9d2'
+branch_labels = None
+depends_on = None
+
+SKILL_COLUMNS = [
+    ('users', ('skills', 'top_languages', 'top_frameworks')),
+    ('projects', ('skills', 'languages', 'frameworks')),
+    ('candidates', ('skills',)),
+]
+BATCH_SIZE = 500
+
+
+def upgrade() -> None:
+    # The models canonicalize these columns on write from now on; this
+    # brings existing rows in line. Only rows that change are updated.
+    bind = op.get_bind()
+    for table_name, columns in SKILL_COLUMNS:
+        table = sa.table(table_name, sa.column('id', sa.Integer), *(sa.column(c, sa.JSON) for c in columns))
+        last_id = 0
+        while True:
+            rows = bind.execute(
+                sa.select(table).where(table.c.id > last_id).order_by(table.c.id).limit(BATCH_SIZE)
+            ).fetchall()
+            if not rows:
+                break
+            for row in rows:
+                values = {c: canonical_skills(row._mapping[c]) for c in columns}
+                if any(values[c] != row._mapping[c] for c in columns):
+                    bind.execute(table.update().where(table.c.id == row.id).values(**values))
+            last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    # The original spellings are not kept; canonical names remain valid
+    pass
@@ -0,0 +1,73 @@
+"""Store SQLite vectors as packed float32 BLOBs
+
+Revision ID: b3f5d8e1a9c4
+Revises: 7c1e9a4d2b60
+Create Date: 2026-10-17 13:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+import numpy as np
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f5d8e1a9c4'
+down_revision = '7c1e9a4d2b60'
+branch_labels = None
+depends_on = None
+
+VECTOR_COLUMNS = [
+    ('candidates', 'candidate_vector'),
+    ('users', 'user_vector'),
+    ('projects', 'project_vector'),
+]
+BATCH_SIZE = 500
+
+
+def _convert(source_type, encode):
+    """Rewrite every vector stored as source_type ('text' or 'blob') in batches."""
+    bind = op.get_bind()
+    for table, column in VECTOR_COLUMNS:
+        last_id = 0
+        while True:
+            rows = bind.execute(
+                sa.text(
+                    f"SELECT id, {column} FROM {table} "
+                    f"WHERE id > :last_id AND typeof({column}) = :source_type "
+                    f"ORDER BY id LIMIT :batch_size"
+                ),
+                {"last_id": last_id, "source_type": source_type, "batch_size": BATCH_SIZE},
+            ).fetchall()
+            if not rows:
+                break
+            bind.execute(
+                sa.text(f"UPDATE {table} SET {column} = :value WHERE id = :id"),
+                [{"id": row_id, "value": encode(value)} for row_id, value in rows],
+            )
+            last_id = rows[-1][0]
+
+
+def _json_to_blob(value):
+    values = json.loads(value)
+    if not values:
+        return None
+    return np.asarray(values, dtype='<f4').tobytes()
+
+
+def _blob_to_json(value):
+    return json.dumps(np.frombuffer(value, dtype='<f4').tolist())
+
+
+def upgrade() -> None:
+    # PostgreSQL stores vectors natively with pgvector. On SQLite the column
+    # affinity is irrelevant for BLOB values, so only the data is rewritten.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _convert('text', _json_to_blob)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _convert('blob', _blob_to_json)
@@ -0,0 +1,30 @@
+"""Add table_generations for write counters shared across processes
+
+Revision ID: c6e2a4f8b1d3
+Revises: a8d4f2c6e0b3
+Create Date: 2026-10-17 21:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e2a4f8b1d3'
+down_revision = 'a8d4f2c6e0b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    table = op.create_table(
+        'table_generations',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('generation', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    op.bulk_insert(table, [{'name': 'candidates', 'generation': 0}])
+
+
+def downgrade() -> None:
+    op.drop_table('table_generations')
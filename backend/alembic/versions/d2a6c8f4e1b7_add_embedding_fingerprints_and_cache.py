@@ -0,0 +1,49 @@
+"""Add embedding fingerprints and the persistent embedding cache
+
+Revision ID: d2a6c8f4e1b7
+Revises: b3f5d8e1a9c4
+Create Date: 2026-10-17 14:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import os
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a6c8f4e1b7'
+down_revision = 'b3f5d8e1a9c4'
+branch_labels = None
+depends_on = None
+
+FINGERPRINTED_TABLES = ['users', 'projects', 'candidates']
+
+
+def _vector_type():
+    if op.get_bind().dialect.name == 'postgresql':
+        from pgvector.sqlalchemy import Vector
+
+        return Vector(int(os.getenv('EMBEDDING_DIMENSIONS', '768')))
+    return sa.LargeBinary()
+
+
+def upgrade() -> None:
+    # Existing rows have no fingerprint, so their next save re-embeds once
+    for table in FINGERPRINTED_TABLES:
+        op.add_column(table, sa.Column('embedding_fingerprint', sa.String(length=64), nullable=True))
+    op.create_table(
+        'embedding_cache',
+        sa.Column('fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('model', sa.String(), nullable=False),
+        sa.Column('dimensions', sa.Integer(), nullable=False),
+        sa.Column('vector', _vector_type(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('fingerprint'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('embedding_cache')
+    for table in FINGERPRINTED_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('embedding_fingerprint')
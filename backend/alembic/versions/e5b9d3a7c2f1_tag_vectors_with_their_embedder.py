@@ -0,0 +1,41 @@
+"""Tag stored vectors with the embedder that produced them
+
+Revision ID: e5b9d3a7c2f1
+Revises: d2a6c8f4e1b7
+Create Date: 2026-10-17 15:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import os
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b9d3a7c2f1'
+down_revision = 'd2a6c8f4e1b7'
+branch_labels = None
+depends_on = None
+
+VECTOR_COLUMNS = [
+    ('candidates', 'candidate_vector'),
+    ('users', 'user_vector'),
+    ('projects', 'project_vector'),
+]
+
+
+def upgrade() -> None:
+    dimensions = int(os.getenv('EMBEDDING_DIMENSIONS', '768'))
+    is_sqlite = op.get_bind().dialect.name == 'sqlite'
+    for table, column in VECTOR_COLUMNS:
+        op.add_column(table, sa.Column('embedder', sa.String(), nullable=True))
+        # Full-size vectors came from Gemini. Old 20-dim keyword fallback
+        # vectors (only possible in SQLite BLOBs) stay untagged so
+        # reembed_vectors.py replaces them.
+        condition = f"length({column}) = {4 * dimensions}" if is_sqlite else f"{column} IS NOT NULL"
+        op.execute(f"UPDATE {table} SET embedder = 'gemini-embedding-001' WHERE {condition}")
+
+
+def downgrade() -> None:
+    for table, _ in VECTOR_COLUMNS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('embedder')
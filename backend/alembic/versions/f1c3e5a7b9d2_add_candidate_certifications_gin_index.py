@@ -0,0 +1,34 @@
+"""Add GIN index on candidate certifications for search filters
+
+Revision ID: f1c3e5a7b9d2
+Revises: e5b9d3a7c2f1
+Create Date: 2026-10-17 16:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c3e5a7b9d2'
+down_revision = 'e5b9d3a7c2f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # JSONB containment filters only exist on PostgreSQL
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.create_index(
+        'idx_candidate_certifications',
+        'candidates',
+        ['certifications'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('idx_candidate_certifications', table_name='candidates')
@@ -0,0 +1,320 @@
+"""
+Process-resident columnar copy of the searchable Candidate attributes.
+
+Active candidates are held as parallel NumPy arrays: experience years, a
+dictionary-encoded location, and dictionary-encoded skills and
+certifications as fixed-width code matrices padded with -1 (widened when
+a candidate has more entries than fit). Structured filters become boolean
+masks over whole columns and facet counts over a result set are a single
+``bincount``, so neither iterates ORM objects or parses JSON per request.
+
+Like the indexes, the store is built at startup and kept in sync by
+session hooks that apply inserts, updates and deactivations after each
+commit, bumping the candidate generation once they are visible. Those hooks
+only see this process's commits, so the store also records the shared
+candidate generation (see generations.py) it reflects. ``current_store``
+hands it out only while that still matches the database, and reloads it
+once another worker or instance has written candidates.
+"""
+import threading
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from . import generations, models
+
+# (lowest years, label); a candidate falls in the last bucket it reaches
+EXPERIENCE_BUCKETS = [(0, "0-2"), (3, "3-5"), (6, "6-9"), (10, "10+")]
+_BUCKET_EDGES = np.array([low for low, _ in EXPERIENCE_BUCKETS[1:]])
+
+_FIELDS = ("experience_years", "location", "skills", "certifications")
+
+
+class Dictionary:
+    """Append-only value <-> int code mapping, kept across store reloads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.codes: dict[str, int] = {}
+        self.values: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self.codes.get(value)
+                if code is None:
+                    self.values.append(value)
+                    code = self.codes[value] = len(self.values) - 1
+        return code
+
+    def lookup(self, values) -> np.ndarray:
+        """Codes of the values already known; unknown values are skipped."""
+        return np.array([self.codes[v] for v in values if v in self.codes], dtype=np.int32)
+
+
+class CandidateStore:
+    """Columnar arrays of active candidates with vectorized filters and facets."""
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._lock = threading.RLock()
+        self.locations = Dictionary()
+        self.skills = Dictionary()
+        self.certifications = Dictionary()
+        self._ids = np.zeros(initial_capacity, dtype=np.int64)
+        self._experience = np.full(initial_capacity, -1, dtype=np.int32)  # -1 = unknown
+        self._location = np.full(initial_capacity, -1, dtype=np.int32)
+        self._skills = np.full((initial_capacity, 16), -1, dtype=np.int32)
+        self._certifications = np.full((initial_capacity, 4), -1, dtype=np.int32)
+        self._rows: dict[int, int] = {}  # id -> row
+        self._size = 0
+        self.generation: int | None = None  # shared candidate generation of the contents
+        self.ready = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._rows
+
+    def memory_bytes(self) -> int:
+        columns = (self._ids, self._experience, self._location, self._skills, self._certifications)
+        return sum(column[: self._size].nbytes for column in columns)
+
+    def stats(self) -> dict:
+        return {
+            "rows": self._size,
+            "skills": len(self.skills),
+            "certifications": len(self.certifications),
+            "locations": len(self.locations),
+            "skill_width": self._skills.shape[1],
+            "memory_bytes": self.memory_bytes(),
+        }
+
+    def _reserve(self, capacity: int) -> None:
+        if capacity <= self._ids.shape[0]:
+            return
+        new_capacity = max(capacity, self._ids.shape[0] * 2)
+
+        def grow(column, fill):
+            grown = np.full((new_capacity,) + column.shape[1:], fill, dtype=column.dtype)
+            grown[: self._size] = column[: self._size]
+            return grown
+
+        self._ids = grow(self._ids, 0)
+        self._experience = grow(self._experience, -1)
+        self._location = grow(self._location, -1)
+        self._skills = grow(self._skills, -1)
+        self._certifications = grow(self._certifications, -1)
+
+    @staticmethod
+    def _widen(matrix: np.ndarray, width: int) -> np.ndarray:
+        if width <= matrix.shape[1]:
+            return matrix
+        wider = np.full((matrix.shape[0], max(width, matrix.shape[1] * 2)), -1, dtype=matrix.dtype)
+        wider[:, : matrix.shape[1]] = matrix
+        return wider
+
+    def _encode(self, dictionary: Dictionary, values) -> list[int]:
+        return sorted({dictionary.encode(str(value)) for value in values or [] if value})
+
+    def upsert(self, item_id: int, experience_years, location, skills, certifications) -> None:
+        with self._lock:
+            row = self._rows.get(item_id)
+            if row is None:
+                self._reserve(self._size + 1)
+                row = self._size
+                self._size += 1
+                self._rows[item_id] = row
+                self._ids[row] = item_id
+            skill_codes = self._encode(self.skills, skills)
+            certification_codes = self._encode(self.certifications, certifications)
+            self._skills = self._widen(self._skills, len(skill_codes))
+            self._certifications = self._widen(self._certifications, len(certification_codes))
+            self._experience[row] = experience_years if experience_years is not None else -1
+            self._location[row] = self.locations.encode(location) if location else -1
+            self._skills[row] = -1
+            self._skills[row, : len(skill_codes)] = skill_codes
+            self._certifications[row] = -1
+            self._certifications[row, : len(certification_codes)] = certification_codes
+
+    def remove(self, item_id: int) -> None:
+        """Drop a row by moving the last row into its slot."""
+        with self._lock:
+            row = self._rows.pop(item_id, None)
+            if row is None:
+                return
+            last = self._size - 1
+            if row != last:
+                for column in (self._ids, self._experience, self._location, self._skills, self._certifications):
+                    column[row] = column[last]
+                self._rows[int(self._ids[row])] = row
+            self._size = last
+
+    def apply(self, ops, span: tuple[int, int] | None = None) -> None:
+        """
+        Apply one commit's (id, fields, or None to remove) changes. span is
+        the commit's shared generation before and after: a store that was
+        current before it is current after it.
+        """
+        with self._lock:
+            for item_id, fields in ops:
+                if fields is None:
+                    self.remove(item_id)
+                else:
+                    self.upsert(item_id, *fields)
+            if span is not None and self.generation == span[0]:
+                self.generation = span[1]
+
+    def build(self, items, generation: int | None = None) -> None:
+        """
+        Replace the contents with (id, experience_years, location, skills,
+        certifications) rows read at the given shared generation. The rows
+        load into new arrays, so filters keep using the old ones until the swap.
+        """
+        fresh = CandidateStore()
+        fresh.locations, fresh.skills, fresh.certifications = self.locations, self.skills, self.certifications
+        for item_id, *fields in items:
+            fresh.upsert(int(item_id), *fields)
+        with self._lock:
+            self._ids, self._experience, self._location = fresh._ids, fresh._experience, fresh._location
+            self._skills, self._certifications = fresh._skills, fresh._certifications
+            self._rows, self._size = fresh._rows, fresh._size
+            self.generation = generation
+            self.ready = True
+
+    def filter(
+        self,
+        min_experience: int | None = None,
+        max_experience: int | None = None,
+        location: str | None = None,
+        skills=(),
+        certifications=(),
+        any_certifications=(),
+    ) -> list[int]:
+        """
+        Ids of candidates passing every given condition, matching the SQL
+        filters: experience bounds exclude unknown experience, location is a
+        case-insensitive substring, skills and certifications must all be
+        present, and any_certifications needs at least one.
+        """
+        with self._lock:
+            n = self._size
+            mask = np.ones(n, dtype=bool)
+            experience = self._experience[:n]
+            if min_experience is not None:
+                mask &= (experience >= 0) & (experience >= min_experience)
+            if max_experience is not None:
+                mask &= (experience >= 0) & (experience <= max_experience)
+            if location:
+                needle = location.strip().casefold()
+                codes = [code for code, value in enumerate(self.locations.values) if needle in value.casefold()]
+                mask &= np.isin(self._location[:n], codes)
+            for dictionary, matrix, required in (
+                (self.skills, self._skills, skills),
+                (self.certifications, self._certifications, certifications),
+            ):
+                required = set(required or [])
+                codes = dictionary.lookup(required)
+                if len(codes) < len(required):
+                    return []  # nobody has a value never seen
+                for code in codes:
+                    mask &= (matrix[:n] == code).any(axis=1)
+            if any_certifications:
+                codes = self.certifications.lookup(any_certifications)
+                mask &= np.isin(self._certifications[:n], codes).any(axis=1)
+            return self._ids[:n][mask].tolist()
+
+    def facets(self, ids, top: int = 20) -> dict:
+        """Skill, location and experience-bucket counts over the given candidate ids."""
+        with self._lock:
+            rows = np.array([self._rows[item_id] for item_id in ids if item_id in self._rows], dtype=np.int64)
+
+            def counts(codes: np.ndarray, dictionary: Dictionary) -> list[dict]:
+                codes = codes[codes >= 0]
+                tally = np.bincount(codes, minlength=len(dictionary)) if codes.size else np.zeros(0, dtype=np.int64)
+                order = np.argsort(-tally, kind="stable")[:top]
+                return [{"value": dictionary.values[code], "count": int(tally[code])} for code in order if tally[code]]
+
+            experience = self._experience[rows]
+            known = experience[experience >= 0]
+            buckets = np.bincount(np.digitize(known, _BUCKET_EDGES), minlength=len(EXPERIENCE_BUCKETS))
+            return {
+                "total": int(rows.size),
+                "skills": counts(self._skills[rows].ravel(), self.skills),
+                "locations": counts(self._location[rows], self.locations),
+                "experience": [
+                    {"value": label, "count": int(count)}
+                    for (_, label), count in zip(EXPERIENCE_BUCKETS, buckets)
+                ],
+            }
+
+
+candidate_store = CandidateStore()
+
+
+def build_candidate_store(db: Session) -> None:
+    """Load every active candidate's searchable attributes."""
+    # Read before the rows, so a write that lands meanwhile leaves the
+    # store tagged as behind and it reloads again
+    generation = generations.shared(db, models.Candidate.__tablename__)
+    rows = (
+        db.query(models.Candidate.id, *(getattr(models.Candidate, field) for field in _FIELDS))
+        .filter(models.Candidate.is_active == True)
+        .yield_per(1000)
+    )
+    candidate_store.build(rows, generation)
+    print(
+        f"Built columnar candidate store with {len(candidate_store)} rows "
+        f"({candidate_store.memory_bytes()} bytes) at generation {generation}"
+    )
+
+
+_refresh_lock = threading.Lock()
+
+
+def current_store(db: Session, wait: bool = False) -> CandidateStore | None:
+    """
+    The candidate store if it reflects every committed candidate write, from
+    any process, else None so the caller uses SQL. A store that has fallen
+    behind is reloaded by one caller; the others get None meanwhile, or
+    with wait=True block until the reload is done.
+    """
+    generation = generations.shared(db, models.Candidate.__tablename__)
+    if candidate_store.ready and candidate_store.generation == generation:
+        return candidate_store
+    if not _refresh_lock.acquire(blocking=wait):
+        return None
+    try:
+        if not candidate_store.ready or candidate_store.generation != generation:
+            build_candidate_store(db)
+    finally:
+        _refresh_lock.release()
+    return candidate_store
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_store_changes(session, flush_context):
+    pending = session.info.setdefault("candidate_store_ops", [])
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, models.Candidate):
+            fields = tuple(getattr(obj, field) for field in _FIELDS) if obj.is_active is not False else None
+            pending.append((obj.id, fields))
+    for obj in session.deleted:
+        if isinstance(obj, models.Candidate):
+            pending.append((obj.id, None))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_store_changes(session):
+    ops = session.info.pop("candidate_store_ops", [])
+    if ops:
+        candidate_store.apply(ops, generations.committed(session, models.Candidate.__tablename__))
+        generations.bump(models.Candidate.__tablename__)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_store_changes(session):
+    session.info.pop("candidate_store_ops", None)
@@ -0,0 +1,291 @@
+"""
+Materialized per-user discover queues.
+
+/matching/discover used to scan and score every unswiped project for each
+card. Instead each user gets a queue of project ids ranked by match score
+(ties to the lowest id), built lazily with one vectorized pass over the
+in-memory project matrix (see match_scoring.py) and then maintained
+incrementally by session hooks:
+
+- project created or updated: rescored in every loaded queue
+- project deactivated or deleted: dropped from every queue
+- swipe: a pass moves the project to the user's reshow queue, a like
+  drops it
+- profile skills, languages or frameworks changed: the user's queue is
+  dropped and rebuilt on the next discover
+
+Serving cards is then a heap peek plus one query that loads the peeked
+projects LEFT JOINed to the user's swipes, checking that each is still
+active and unswiped (or passed, for reshows). That also covers writes
+made by other workers. Queues are rebuilt after DISCOVER_QUEUE_TTL seconds and
+the project matrix is reloaded after PROJECT_MATRIX_TTL seconds so
+projects created elsewhere show up, and at most DISCOVER_QUEUE_USERS
+queues are kept (least recently used are dropped).
+"""
+import heapq
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from sqlalchemy import and_, event, inspect
+from sqlalchemy.orm import Session
+from . import generations, models
+from .match_scoring import PROFILE_FIELDS, calculate_match_score, ensure_project_matrix, match_strength, project_matrix
+
+DISCOVER_QUEUE_USERS = int(os.getenv("DISCOVER_QUEUE_USERS", "1000"))
+DISCOVER_QUEUE_TTL = float(os.getenv("DISCOVER_QUEUE_TTL", "300"))
+
+Profile = namedtuple("Profile", PROFILE_FIELDS)
+ProjectFeatures = namedtuple("ProjectFeatures", ("id", "owner_id", "is_active", "skills", "languages", "frameworks", "complexity"))
+
+
+class RankedSet:
+    """Ids ranked by (score desc, id asc): heap with lazy deletion, O(1) amortized peek."""
+
+    def __init__(self):
+        self._heap: list[tuple[float, int]] = []
+        self._scores: dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._scores
+
+    def score(self, item_id: int) -> float | None:
+        return self._scores.get(item_id)
+
+    def put(self, item_id: int, score: float) -> None:
+        self._scores[item_id] = score
+        heapq.heappush(self._heap, (-score, item_id))
+        if len(self._heap) > 2 * len(self._scores) + 64:
+            # Too many superseded entries: rebuild from the live scores
+            self._heap = [(-s, i) for i, s in self._scores.items()]
+            heapq.heapify(self._heap)
+
+    def discard(self, item_id: int) -> None:
+        self._scores.pop(item_id, None)
+
+    def fill(self, scores: dict[int, float]) -> None:
+        """Replace the contents in one heapify instead of one push per id."""
+        self._scores = dict(scores)
+        self._heap = [(-score, item_id) for item_id, score in self._scores.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, k: int, exclude=()) -> list[tuple[int, float]]:
+        """Up to k best (id, score) pairs, skipping ids in exclude. Nothing is removed."""
+        heap, held, found = self._heap, {}, []
+        while heap and len(found) < k:
+            negative, item_id = heapq.heappop(heap)
+            if self._scores.get(item_id) != -negative or item_id in held:
+                continue  # discarded, superseded or a duplicate entry
+            held[item_id] = negative
+            if item_id not in exclude:
+                found.append((item_id, -negative))
+        for item_id, negative in held.items():
+            heapq.heappush(heap, (negative, item_id))
+        return found
+
+
+class UserQueue:
+    """Never-swiped projects and passed ones (reshown once fresh ones run out)."""
+
+    def __init__(self, user_id: int, profile: Profile):
+        self.user_id = user_id
+        self.profile = profile
+        self.built_at = time.monotonic()
+        self.fresh = RankedSet()
+        self.reshow = RankedSet()
+        self.liked: set[int] = set()
+        self.passed: set[int] = set()
+
+    def apply_project(self, project: ProjectFeatures) -> None:
+        if not project.is_active or project.owner_id == self.user_id:
+            self.fresh.discard(project.id)
+            self.reshow.discard(project.id)
+            return
+        if project.id in self.liked:
+            return
+        score, _ = calculate_match_score(self.profile, project)
+        (self.reshow if project.id in self.passed else self.fresh).put(project.id, score)
+
+    def apply_swipe(self, project_id: int, is_like: bool) -> None:
+        score = self.fresh.score(project_id)
+        if score is None:
+            score = self.reshow.score(project_id)
+        self.fresh.discard(project_id)
+        if is_like:
+            self.reshow.discard(project_id)
+            self.liked.add(project_id)
+            return
+        self.passed.add(project_id)
+        if score is not None:
+            self.reshow.put(project_id, score)
+
+
+class DiscoverQueues:
+    def __init__(self, max_users: int = DISCOVER_QUEUE_USERS, ttl: float = DISCOVER_QUEUE_TTL):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._queues: OrderedDict[int, UserQueue] = OrderedDict()
+        self.builds = 0
+        self.served = 0
+        self.stale = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._queues),
+                "max_users": self.max_users,
+                "ttl_seconds": self.ttl,
+                "builds": self.builds,
+                "served": self.served,
+                "stale_skipped": self.stale,
+            }
+
+    def _build(self, db: Session, user: models.User) -> UserQueue:
+        queue = UserQueue(user.id, Profile(*(getattr(user, field) for field in PROFILE_FIELDS)))
+        for project_id, is_like in db.query(models.Swipe.project_id, models.Swipe.is_like).filter(
+            models.Swipe.user_id == user.id
+        ):
+            (queue.liked if is_like else queue.passed).add(project_id)
+        # One vectorized pass over the in-memory project bitsets
+        ensure_project_matrix(db)
+        ids, scores = project_matrix.score(queue.profile, exclude_owner=user.id)
+        fresh, reshow = {}, {}
+        for project_id, score in zip(ids.tolist(), scores.tolist()):
+            if project_id not in queue.liked:
+                (reshow if project_id in queue.passed else fresh)[project_id] = score
+        queue.fresh.fill(fresh)
+        queue.reshow.fill(reshow)
+        return queue
+
+    def _queue(self, db: Session, user: models.User) -> UserQueue:
+        with self._lock:
+            queue = self._queues.get(user.id)
+            if queue is not None and time.monotonic() - queue.built_at < self.ttl:
+                self._queues.move_to_end(user.id)
+                return queue
+        # Build outside the lock. Project writes applied meanwhile would be
+        # missed, so the queue is only kept if there were none.
+        generation = generations.current(models.Project.__tablename__)
+        queue = self._build(db, user)
+        with self._lock:
+            self.builds += 1
+            if generation == generations.current(models.Project.__tablename__):
+                self._queues[user.id] = queue
+                self._queues.move_to_end(user.id)
+                while len(self._queues) > self.max_users:
+                    self._queues.popitem(last=False)
+        return queue
+
+    @staticmethod
+    def _still_valid(user_id: int, project: models.Project | None, is_like: bool | None, reshow: bool) -> bool:
+        if project is None or not project.is_active or project.owner_id == user_id:
+            return False
+        return is_like is None if not reshow else is_like is False
+
+    def next_batch(self, db: Session, user: models.User, n: int, exclude=()) -> list:
+        """
+        Up to n best projects for the user as (project, score, strength,
+        is_reshow), never-swiped ones first, skipping ids in exclude. Each
+        round of peeked ids is checked in one query LEFT JOINing the user's
+        swipes; stale entries are dropped and replaced from the queue.
+        """
+        queue = self._queue(db, user)
+        exclude = set(exclude or ())
+        served = []
+        while len(served) < n:
+            wanted = n - len(served)
+            with self._lock:
+                hits = [(project_id, score, False) for project_id, score in queue.fresh.top(wanted, exclude)]
+                if len(hits) < wanted:
+                    hits += [(project_id, score, True) for project_id, score in queue.reshow.top(wanted - len(hits), exclude)]
+            if not hits:
+                break
+            rows = db.query(models.Project, models.Swipe.is_like).outerjoin(
+                models.Swipe, and_(models.Swipe.project_id == models.Project.id, models.Swipe.user_id == user.id)
+            ).filter(models.Project.id.in_([project_id for project_id, _, _ in hits]))
+            found = {project.id: (project, is_like) for project, is_like in rows}
+            stale = []
+            for project_id, score, reshow in hits:
+                exclude.add(project_id)
+                project, is_like = found.get(project_id, (None, None))
+                if self._still_valid(user.id, project, is_like, reshow):
+                    served.append((project, score, match_strength(score), reshow))
+                else:
+                    stale.append(project_id)
+            with self._lock:
+                self.served += len(hits) - len(stale)
+                self.stale += len(stale)
+                for project_id in stale:
+                    queue.fresh.discard(project_id)
+                    queue.reshow.discard(project_id)
+        return served
+
+    def next(self, db: Session, user: models.User, exclude: int | None = None):
+        """
+        The best project for the user as (project, score, strength, is_reshow),
+        or None when nothing is left.
+        """
+        served = self.next_batch(db, user, 1, exclude=() if exclude is None else (exclude,))
+        return served[0] if served else None
+
+    def apply(self, projects, swipes, profiles) -> None:
+        with self._lock:
+            for user_id in profiles:
+                self._queues.pop(user_id, None)
+            for project in projects:
+                for queue in self._queues.values():
+                    queue.apply_project(project)
+            for user_id, project_id, is_like in swipes:
+                queue = self._queues.get(user_id)
+                if queue is not None:
+                    queue.apply_swipe(project_id, is_like)
+
+
+discover_queues = DiscoverQueues()
+
+
+def record_swipes(session: Session, swipes) -> None:
+    """
+    Queue (user_id, project_id, is_like) swipes inserted with Core
+    statements, which the flush hook never sees, to apply on commit.
+    """
+    session.info.setdefault("discover_queue_ops", ([], [], set()))[1].extend(swipes)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_discover_changes(session, flush_context):
+    pending = session.info.setdefault("discover_queue_ops", ([], [], set()))
+    projects, swipes, profiles = pending
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, models.Project):
+            projects.append(ProjectFeatures(
+                obj.id, obj.owner_id, obj.is_active is not False,
+                obj.skills, obj.languages, obj.frameworks, obj.complexity,
+            ))
+        elif isinstance(obj, models.Swipe) and obj in session.new:
+            swipes.append((obj.user_id, obj.project_id, bool(obj.is_like)))
+        elif isinstance(obj, models.User) and obj not in session.new:
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in PROFILE_FIELDS):
+                profiles.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, models.Project):
+            projects.append(ProjectFeatures(obj.id, obj.owner_id, False, None, None, None, None))
+        elif isinstance(obj, models.User):
+            profiles.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_discover_changes(session):
+    pending = session.info.pop("discover_queue_ops", None)
+    if pending is not None:
+        discover_queues.apply(*pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_discover_changes(session):
+    session.info.pop("discover_queue_ops", None)
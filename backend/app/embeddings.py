@@ -0,0 +1,442 @@
+"""
+Embedding helpers shared by the routers.
+
+Search queries are embedded with the ``RETRIEVAL_QUERY`` task type (stored
+profiles and candidates use ``RETRIEVAL_DOCUMENT``) and go through a bounded
+LRU cache with a TTL, so repeated recruiter queries skip the Gemini round
+trip. Cache keys include the model, task type and dimensionality, so
+changing any of them can never serve a stale vector.
+
+Stored users, projects and candidates are embedded from one canonical
+document per entity. Each row records the fingerprint of the document its
+vector was built from, so a save that does not change the document (e.g.
+a new avatar) does not re-embed, and the ``embedding_cache`` table serves
+any document that has been embedded before.
+
+All embedding calls go through a micro-batching dispatcher: texts requested
+concurrently by different requests are held for up to
+``EMBEDDING_BATCH_WINDOW_MS`` (or until ``EMBEDDING_BATCH_SIZE`` are
+waiting) and sent as one ``embed_content`` call, with at most
+``EMBEDDING_BATCH_CONCURRENCY`` calls in flight.
+
+Gemini sits behind a circuit breaker. Texts it fails to embed, and every
+text while the breaker is open, are embedded by the local hashing embedder
+instead, and stored rows record which embedder produced their vector so
+``reembed_vectors.py`` can replace local vectors once Gemini is back.
+"""
+import hashlib
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from sqlalchemy.orm import Session
+from . import gemini_agent, models
+from .gemini_agent import EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_CONCURRENCY
+from .local_embedder import LOCAL_EMBEDDER, hashing_embed_many
+from .vector import EMBEDDING_DIMENSIONS
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "3600"))
+# 0 disables cross-request batching: each caller embeds its own texts
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+EMBEDDING_BREAKER_FAILURES = int(os.getenv("EMBEDDING_BREAKER_FAILURES", "3"))
+EMBEDDING_BREAKER_RESET_SECONDS = float(os.getenv("EMBEDDING_BREAKER_RESET_SECONDS", "60"))
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire ttl seconds after insertion."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing service. After failure_threshold consecutive
+    failures the breaker opens and calls are refused for reset_timeout
+    seconds; then trial calls are let through (half-open) and the first
+    success closes it again, while a failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if success:
+                self._failures = 0
+                self._opened_at = None
+                return
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    self.trips += 1
+                    print(f"Gemini embedding circuit opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self._failures, "trips": self.trips}
+
+
+breaker = CircuitBreaker(EMBEDDING_BREAKER_FAILURES, EMBEDDING_BREAKER_RESET_SECONDS)
+
+
+def _remote_batch(texts: list, task_type: str) -> list:
+    """One Gemini batch call guarded by the breaker; refused or failed texts get []."""
+    if not breaker.allow():
+        return [[] for _ in texts]
+    vectors = gemini_agent.embed_batch(texts, task_type)
+    breaker.record(any(vectors))
+    return vectors
+
+
+class EmbeddingDispatcher:
+    """
+    Coalesces embedding requests from concurrent callers into batch calls.
+
+    Callers enqueue texts and block on a Future. A collector thread takes
+    the first waiting text, keeps collecting until window seconds have
+    passed or max_batch texts are waiting, and hands the batch (split by
+    task type) to a pool of concurrency workers that make the call and
+    resolve each caller's Future with its own vector.
+    """
+
+    def __init__(self, window: float, max_batch: int, concurrency: int):
+        self.window = window
+        self.max_batch = max_batch
+        self.concurrency = concurrency
+        self._queue: queue.Queue = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="embed-batch")
+        self._collector: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.requests = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.largest_batch = 0
+        self._wait_seconds = 0.0
+        self._call_seconds = 0.0
+
+    def _start(self) -> None:
+        # Started lazily so forked uvicorn workers each get their own thread
+        with self._lock:
+            if self._collector is None or not self._collector.is_alive():
+                self._collector = threading.Thread(target=self._collect, name="embed-collector", daemon=True)
+                self._collector.start()
+
+    def submit(self, text: str, task_type: str) -> Future:
+        self._start()
+        future: Future = Future()
+        with self._lock:
+            self.requests += 1
+        self._queue.put((text, task_type, future, time.monotonic()))
+        return future
+
+    def embed(self, texts: list, task_type: str = "RETRIEVAL_DOCUMENT") -> list:
+        """Embed texts through the shared batches; blocks until all are done."""
+        futures = [self.submit(text, task_type) for text in texts]
+        return [future.result() for future in futures]
+
+    def embed_now(self, texts: list, task_type: str = "RETRIEVAL_DOCUMENT") -> list:
+        """
+        Embed only these texts, without waiting for other callers (batching
+        off). Chunks of max_batch still run concurrently on the shared pool,
+        so calls in flight stay bounded across callers.
+        """
+        chunks = [texts[start : start + self.max_batch] for start in range(0, len(texts), self.max_batch)]
+        results = self._pool.map(lambda chunk: _remote_batch(chunk, task_type), chunks)
+        return [vector for chunk in results for vector in chunk]
+
+    def _collect(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            by_task: dict[str, list] = {}
+            for item in batch:
+                by_task.setdefault(item[1], []).append(item)
+            for task_type, items in by_task.items():
+                with self._lock:
+                    self._in_flight += 1
+                self._pool.submit(self._dispatch, task_type, items)
+
+    def _dispatch(self, task_type: str, items: list) -> None:
+        started = time.monotonic()
+        try:
+            vectors = _remote_batch([text for text, _, _, _ in items], task_type)
+            for (_, _, future, _), vector in zip(items, vectors):
+                future.set_result(vector)
+        except Exception as e:
+            for _, _, future, _ in items:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._in_flight -= 1
+                self.batches += 1
+                self.batched_items += len(items)
+                self.largest_batch = max(self.largest_batch, len(items))
+                self._wait_seconds += sum(started - queued for _, _, _, queued in items)
+                self._call_seconds += elapsed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "window_ms": self.window * 1000,
+                "max_batch": self.max_batch,
+                "concurrency": self.concurrency,
+                "queued": self._queue.qsize(),
+                "in_flight": self._in_flight,
+                "requests": self.requests,
+                "batches": self.batches,
+                "largest_batch": self.largest_batch,
+                "avg_batch_size": round(self.batched_items / self.batches, 2) if self.batches else 0.0,
+                "avg_wait_ms": round(self._wait_seconds * 1000 / self.batched_items, 2) if self.batched_items else 0.0,
+                "avg_call_ms": round(self._call_seconds * 1000 / self.batches, 2) if self.batches else 0.0,
+            }
+
+
+dispatcher = EmbeddingDispatcher(EMBEDDING_BATCH_WINDOW_MS / 1000, EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_CONCURRENCY)
+
+
+def embed_texts(texts: list, task_type: str = "RETRIEVAL_DOCUMENT") -> list[tuple[list, str | None]]:
+    """
+    Embed texts, sharing batch calls with concurrent requests when batching
+    is on. Returns (vector, embedder) per text; texts Gemini could not embed
+    fall back to the local embedder, and ([], None) means neither could.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    if EMBEDDING_BATCH_WINDOW_MS <= 0:
+        vectors = dispatcher.embed_now(texts, task_type)
+    else:
+        vectors = dispatcher.embed(texts, task_type)
+    results = [(vector, EMBEDDING_MODEL) if vector else None for vector in vectors]
+    failed = [i for i, result in enumerate(results) if result is None]
+    for i, local in zip(failed, hashing_embed_many([texts[i] for i in failed])):
+        results[i] = (local, LOCAL_EMBEDDER if local else None)
+    return results
+
+
+query_cache = TTLCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+
+
+def normalize_query(text: str) -> str:
+    """Case-fold and collapse whitespace so trivially different queries share an entry."""
+    return " ".join((text or "").casefold().split())
+
+
+def embed_query(text: str, allow_local: bool = True) -> list:
+    """
+    Embed a search query, serving repeats from the cache. The normalized
+    text is what gets embedded, so a hit returns exactly what a miss would.
+    Only Gemini vectors are cached, so a query embedded locally during an
+    outage is embedded properly once the API is back. With allow_local=False
+    a query Gemini could not embed gives [] instead of a local vector, for
+    callers that have a better fallback than comparing across spaces.
+    """
+    query = normalize_query(text)
+    key = (query, EMBEDDING_MODEL, "RETRIEVAL_QUERY", EMBEDDING_DIMENSIONS)
+    vector = query_cache.get(key)
+    if vector is not None:
+        return vector
+    vector, embedder = embed_texts([query], task_type="RETRIEVAL_QUERY")[0]
+    if embedder == EMBEDDING_MODEL:
+        query_cache.put(key, vector)
+    elif not allow_local:
+        return []
+    return vector
+
+
+def _terms(values) -> str:
+    """Dedupe case-insensitively and sort, so list order never changes the document."""
+    seen = {}
+    for value in values or []:
+        if value and str(value).strip():
+            seen.setdefault(str(value).strip().casefold(), str(value).strip())
+    return ", ".join(sorted(seen.values(), key=str.casefold))
+
+
+def _document(*fields: tuple[str, str]) -> str:
+    return "\n".join(f"{label}: {value}" for label, value in fields if value and str(value).strip())
+
+
+def user_document(user) -> str:
+    return _document(
+        ("Name", user.name),
+        ("Bio", user.bio),
+        ("Skills", _terms(user.skills)),
+        ("Languages", _terms(user.top_languages)),
+        ("Frameworks", _terms(user.top_frameworks)),
+    )
+
+
+def project_document(project) -> str:
+    return _document(
+        ("Title", project.title),
+        ("Summary", project.summary),
+        ("Languages", _terms(project.languages)),
+        ("Frameworks", _terms(project.frameworks)),
+    )
+
+
+def candidate_document(candidate) -> str:
+    return _document(
+        ("Title", candidate.title),
+        ("Summary", candidate.summary),
+        ("Skills", _terms(candidate.skills)),
+    )
+
+
+# model -> (document builder, vector attribute)
+DOCUMENTS = {
+    models.User: (user_document, "user_vector"),
+    models.Project: (project_document, "project_vector"),
+    models.Candidate: (candidate_document, "candidate_vector"),
+}
+
+
+def fingerprint(document: str) -> str:
+    """sha256 of (model, dimensions, document)."""
+    key = f"{EMBEDDING_MODEL}\0{EMBEDDING_DIMENSIONS}\0{document}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _cached_vectors(db: Session, keys: set[str]) -> dict:
+    """fingerprint -> vector for every key already in embedding_cache (or pending in db)."""
+    found = {}
+    if keys:
+        rows = db.query(models.EmbeddingCache).filter(models.EmbeddingCache.fingerprint.in_(list(keys)))
+        found.update((row.fingerprint, row) for row in rows)
+    found.update(
+        (obj.fingerprint, obj)
+        for obj in db.new
+        if isinstance(obj, models.EmbeddingCache) and obj.fingerprint in keys
+    )
+    return found
+
+
+def embed_documents(db: Session, documents: list[str]) -> list[tuple[str, list | None, str | None]]:
+    """
+    Return (fingerprint, vector, embedder) per document, in order. Documents
+    found in the embedding_cache table are served from it; the rest are
+    embedded in batches and Gemini vectors are added to the cache in db's
+    transaction. Local fallback vectors are never cached; a document neither
+    embedder could handle gets (fingerprint, None, None).
+    """
+    keys = [fingerprint(document) for document in documents]
+    cached = _cached_vectors(db, set(keys))
+    results = {key: (row.vector, EMBEDDING_MODEL) for key, row in cached.items() if row.vector is not None}
+    missing = {key: document for key, document in zip(keys, documents) if key not in results}
+    if missing:
+        embedded = embed_texts(list(missing.values()))
+        for key, (vector, embedder) in zip(missing, embedded):
+            if not vector:
+                continue
+            results[key] = (vector, embedder)
+            if embedder != EMBEDDING_MODEL:
+                continue
+            if key in cached:
+                cached[key].vector = vector
+            else:
+                db.add(models.EmbeddingCache(
+                    fingerprint=key, model=EMBEDDING_MODEL, dimensions=EMBEDDING_DIMENSIONS, vector=vector
+                ))
+    return [(key, *results.get(key, (None, None))) for key in keys]
+
+
+def refresh_embeddings(db: Session, objs, force: bool = False) -> int:
+    """
+    Re-embed the users, projects or candidates whose document changed since
+    their vector was computed, or whose vector came from the local fallback,
+    in as few embedding calls as possible. force re-embeds every row.
+    Returns how many vectors were (re)assigned.
+    """
+    stale = []
+    for obj in objs:
+        build, attr = DOCUMENTS[type(obj)]
+        document = build(obj)
+        if (
+            force
+            or obj.embedding_fingerprint != fingerprint(document)
+            or obj.embedder != EMBEDDING_MODEL
+            or getattr(obj, attr) is None
+        ):
+            stale.append((obj, attr, document))
+    results = embed_documents(db, [document for _, _, document in stale])
+    for (obj, attr, _), (key, vector, embedder) in zip(stale, results):
+        setattr(obj, attr, vector)
+        obj.embedding_fingerprint = key if vector is not None else None
+        obj.embedder = embedder
+    return len(stale)
+
+
+def refresh_embedding(db: Session, obj) -> bool:
+    """Single-row refresh_embeddings. Returns True if the vector was (re)assigned."""
+    return refresh_embeddings(db, [obj]) > 0
@@ -6,10 +6,16 @@ from google.adk import Runner
 from google.adk.sessions import InMemorySessionService
 from types import SimpleNamespace
 import uuid
+from .vector import EMBEDDING_DIMENSIONS
 
 load_dotenv()
 genai.configure(api_key=(os.getenv("GEMINI_API_KEY") or "").strip())
 
+EMBEDDING_MODEL = "gemini-embedding-001"
+EMBEDDING_BATCH_SIZE = min(100, int(os.getenv("EMBEDDING_BATCH_SIZE", "100")))  # embed_content takes at most 100 texts
+EMBEDDING_BATCH_CONCURRENCY = int(os.getenv("EMBEDDING_BATCH_CONCURRENCY", "4"))
+EMBEDDING_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_TIMEOUT_SECONDS", "10"))
+
 SYSTEM_PROMPT = """
 You are the autonomous reasoning and data-processing layer of "Origin".
 Follow the structured schemas based on the input `task`.
@@ -258,15 +264,17 @@ def analyze_user_repos(username: str, repos_meta: list):
     )
     return _parse_json_from_response(resp)
 
-def embed_text(text: str) -> list:
+def embed_text(text: str, task_type: str = "RETRIEVAL_DOCUMENT") -> list:
     try:
         # Use the correct Gemini embedding model
         # Model: models/text-embedding-004 is the latest embedding model from Google
         # task_type can be: RETRIEVAL_DOCUMENT, RETRIEVAL_QUERY, SEMANTIC_SIMILARITY, CLASSIFICATION, CLUSTERING
         result = genai.embed_content(
-            model="gemini-embedding-001",
+            model=EMBEDDING_MODEL,
             content=text or "",
-            task_type="RETRIEVAL_DOCUMENT"  # for indexing documents in a database
+            task_type=task_type,  # RETRIEVAL_DOCUMENT for stored rows, RETRIEVAL_QUERY for searches
+            output_dimensionality=EMBEDDING_DIMENSIONS,
+            request_options={"timeout": EMBEDDING_TIMEOUT_SECONDS}
         )
         
         # Extract embedding from the result
@@ -288,10 +296,35 @@ def embed_text(text: str) -> list:
         print(f"Gemini embedding failed: {e}")
         import traceback
         traceback.print_exc()
-        # Fallback to simple keyword-based embedding
-        words = (text or "").lower().split()
-        vocab = ["python","javascript","react","fastapi","ml","ai","mobile","blockchain","data","web","frontend","backend","database","api","ui","ux","design","development","programming","coding"]
-        return [float(sum(1 for w in words if v in w)) for v in vocab]
+        # No usable vector: a keyword-count vector would not match the
+        # configured dimensionality and could never be compared
+        return []
+
+def embed_batch(texts: list, task_type: str) -> list:
+    """Embed up to EMBEDDING_BATCH_SIZE texts in one call, falling back to one call per text."""
+    try:
+        result = genai.embed_content(
+            model=EMBEDDING_MODEL,
+            content=[text or "" for text in texts],
+            task_type=task_type,
+            output_dimensionality=EMBEDDING_DIMENSIONS,
+            request_options={"timeout": EMBEDDING_TIMEOUT_SECONDS}
+        )
+        embeddings = result['embedding']
+        if len(embeddings) != len(texts):
+            raise ValueError(f"Got {len(embeddings)} embeddings for {len(texts)} texts")
+        return [emb['values'] if isinstance(emb, dict) else list(emb) for emb in embeddings]
+    except Exception as e:
+        # One bad input fails the whole batch; retry singly so only it is lost.
+        # Two failures in a row look like an outage rather than bad input,
+        # so the rest are given up instead of each waiting for a timeout.
+        print(f"Gemini batch embedding failed, embedding {len(texts)} texts one by one: {e}")
+        vectors, failures = [], 0
+        for text in texts:
+            vector = embed_text(text, task_type) if failures < 2 else []
+            failures = 0 if vector else failures + 1
+            vectors.append(vector)
+        return vectors
 
 def monitor_chat_message(message_content: str, project_title: str, project_summary: str) -> dict:
     """
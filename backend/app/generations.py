@@ -0,0 +1,59 @@
+"""
+Per-table write generations.
+
+Each indexed table has a counter that is bumped after a commit touching
+its rows has been applied to this process's indexes. Caches of anything
+derived from those indexes tag entries with the generation they were
+computed at and only serve entries whose tag is still current, so a write
+makes every older entry unreachable without tracking what it affected.
+Every index bumps after applying its own changes, so a result computed
+while any of them was still behind is tagged with an older generation.
+
+Those counters only see this process's commits. Tables that several
+workers and instances write also keep a counter in the database
+(``models.TableGeneration``), bumped inside every transaction that flushes
+a change to their rows, so it commits or rolls back with the write.
+``shared`` reads it, for caches and in-memory copies that have to notice
+writes made by other processes. Writes that bypass the ORM (raw SQL,
+migrations) do not bump it.
+"""
+import threading
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from . import models
+
+_lock = threading.Lock()
+_generations: dict[str, int] = {}
+
+_shared = models.TableGeneration.__table__
+
+
+def current(table: str) -> int:
+    return _generations.get(table, 0)
+
+
+def bump(table: str) -> int:
+    with _lock:
+        _generations[table] = _generations.get(table, 0) + 1
+        return _generations[table]
+
+
+def snapshot() -> dict:
+    return dict(_generations)
+
+
+def shared(db: Session, table: str) -> int:
+    """The table's generation as every process sees it (0 before its first write)."""
+    return db.execute(select(_shared.c.generation).where(_shared.c.name == table)).scalar() or 0
+
+
+def committed(session: Session, table: str) -> tuple[int, int] | None:
+    """
+    (shared generation before, shared generation after) of the transaction
+    the session just committed, for after_commit hooks, or None if it did
+    not write the table. The generation row stays locked from the first
+    bump to the commit, so no other write lands in between: a copy that was
+    at the first value and has applied this transaction's changes is at
+    the second.
+    """
+    return session.info.get("table_generations", {}).get(table)
@@ -0,0 +1,264 @@
+"""
+Process-resident BM25 index over candidate text.
+
+Embeddings blur rare exact terms: a query for "Terraform" or "Solidity"
+ranks candidates who merely look like infrastructure or blockchain people
+next to the ones who list the skill. This inverted index scores candidates
+with Okapi BM25 over their skills, title, summary and work-history
+descriptions, so exact terms count. Fields are weighted by repeating their
+terms (``FIELD_WEIGHTS``), which is the usual cheap stand-in for BM25F.
+
+Like the in-memory vector indexes, it is built at startup and kept in sync
+by session hooks that apply inserts, updates and deactivations after each
+commit. Those hooks only see this process's commits, so the index also
+records the shared candidate generation (see generations.py) it reflects,
+and ``ensure_lexical_index`` rebuilds it once another worker or instance
+has written candidates. It needs no network, so talent search can fall
+back to it alone when embeddings are unavailable.
+"""
+import math
+import os
+import re
+import threading
+from collections import Counter
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from . import generations, models
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+FIELD_WEIGHTS = {"skills": 3, "title": 2, "summary": 1, "work_history": 1}
+
+# Tokens keep the punctuation of names like "c++", "c#" and "node.js"
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+_PARTS = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is of on or the to with who years year experience".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased terms of text. "node.js" also yields "node" and "js" so either half matches."""
+    terms = []
+    for token in _TOKEN.findall((text or "").lower()):
+        token = token.rstrip(".")
+        if not token or token in STOPWORDS:
+            continue
+        terms.append(token)
+        parts = _PARTS.findall(token)
+        if len(parts) > 1:
+            terms.extend(part for part in parts if part not in STOPWORDS)
+    return terms
+
+
+def candidate_terms(skills, title, summary, work_history) -> Counter:
+    """Weighted term frequencies of one candidate's searchable fields."""
+    terms = Counter()
+    fields = {
+        "skills": " ".join(str(skill) for skill in skills or []),
+        "title": title,
+        "summary": summary,
+        "work_history": " ".join(
+            str(job.get("description") or "") for job in work_history or [] if isinstance(job, dict)
+        ),
+    }
+    for field, text in fields.items():
+        for term in tokenize(text):
+            terms[term] += FIELD_WEIGHTS[field]
+    return terms
+
+
+class BM25Index:
+    """Inverted index of term -> {id: weighted term frequency} scored with Okapi BM25."""
+
+    kind = "bm25"
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings: dict[str, dict[int, float]] = {}
+        self._lengths: dict[int, float] = {}  # id -> weighted document length
+        self._terms: dict[int, tuple[str, ...]] = {}  # id -> its terms, for removal
+        self._total_length = 0.0
+        self.generation: int | None = None  # shared candidate generation of the contents
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._lengths
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "documents": len(self._lengths),
+                "terms": len(self._postings),
+                "postings": sum(len(posting) for posting in self._postings.values()),
+            }
+
+    def build(self, items, generation: int | None = None) -> None:
+        """
+        Replace the contents with (id, term counts) pairs read at the given
+        shared generation. They load into a new index, so searches keep
+        using the old one until the swap.
+        """
+        fresh = BM25Index(self.k1, self.b)
+        for item_id, terms in items:
+            fresh.upsert(item_id, terms)
+        with self._lock:
+            self._postings, self._lengths, self._terms = fresh._postings, fresh._lengths, fresh._terms
+            self._total_length = fresh._total_length
+            self.generation = generation
+            self.ready = True
+
+    def apply(self, ops, span: tuple[int, int] | None = None) -> None:
+        """
+        Apply one commit's (id, term counts, or None to remove) changes.
+        span is the commit's shared generation before and after: an index
+        that was current before it is current after it.
+        """
+        with self._lock:
+            for item_id, terms in ops:
+                if terms is None:
+                    self.remove(item_id)
+                else:
+                    self.upsert(item_id, terms)
+            if span is not None and self.generation == span[0]:
+                self.generation = span[1]
+
+    def upsert(self, item_id: int, terms: Counter) -> None:
+        with self._lock:
+            self.remove(item_id)
+            if not terms:
+                return
+            for term, count in terms.items():
+                self._postings.setdefault(term, {})[item_id] = float(count)
+            length = float(sum(terms.values()))
+            self._lengths[item_id] = length
+            self._terms[item_id] = tuple(terms)
+            self._total_length += length
+
+    def remove(self, item_id: int) -> None:
+        with self._lock:
+            length = self._lengths.pop(item_id, None)
+            if length is None:
+                return
+            self._total_length -= length
+            for term in self._terms.pop(item_id):
+                posting = self._postings[term]
+                posting.pop(item_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def search(self, query: str, k: int = 20, allowed=None) -> list[tuple[int, float]]:
+        """
+        Return up to k (id, score) pairs for the query terms, best first.
+        Only ids in ``allowed`` are scored when it is given; documents
+        matching no query term are never returned.
+        """
+        allowed = set(allowed) if allowed is not None else None
+        with self._lock:
+            count = len(self._lengths)
+            if not count:
+                return []
+            average = self._total_length / count
+            scores: dict[int, float] = {}
+            for term in set(tokenize(query)):
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1.0 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for item_id, tf in posting.items():
+                    if allowed is not None and item_id not in allowed:
+                        continue
+                    norm = self.k1 * (1.0 - self.b + self.b * self._lengths[item_id] / average)
+                    scores[item_id] = scores.get(item_id, 0.0) + idf * tf * (self.k1 + 1.0) / (tf + norm)
+        return sorted(scores.items(), key=lambda hit: (-hit[1], hit[0]))[:k]
+
+
+def reciprocal_rank_fusion(*rankings, k: int = 60) -> list[tuple[int, float]]:
+    """
+    Fuse ranked (id, score) lists by summing 1 / (k + rank) per list. Only
+    ranks matter, so BM25 and cosine scores need no calibration against
+    each other. Scores are scaled so that ranking first in every list is 1.0.
+    """
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, (item_id, _) in enumerate(ranking, start=1):
+            fused[item_id] = fused.get(item_id, 0.0) + 1.0 / (k + rank)
+    best = len(rankings) / (k + 1) if rankings else 1.0
+    return sorted(((item_id, score / best) for item_id, score in fused.items()), key=lambda hit: (-hit[1], hit[0]))
+
+
+candidate_lexical_index = BM25Index()
+
+_CANDIDATE_FIELDS = ("skills", "title", "summary", "work_history")
+
+
+def build_lexical_index(db: Session) -> None:
+    """Load every active candidate's text into the BM25 index."""
+    # Read before the rows, so a write that lands meanwhile leaves the
+    # index tagged as behind and it rebuilds again
+    generation = generations.shared(db, models.Candidate.__tablename__)
+    rows = (
+        db.query(models.Candidate.id, *(getattr(models.Candidate, field) for field in _CANDIDATE_FIELDS))
+        .filter(models.Candidate.is_active == True)
+        .yield_per(1000)
+    )
+    candidate_lexical_index.build(((row[0], candidate_terms(*row[1:])) for row in rows), generation)
+    print(
+        f"Built candidates {candidate_lexical_index.kind} lexical index with "
+        f"{len(candidate_lexical_index)} rows at generation {generation}"
+    )
+
+
+_refresh_lock = threading.Lock()
+
+
+def ensure_lexical_index(db: Session) -> bool:
+    """
+    Rebuild the BM25 index if it is missing candidate writes committed by
+    any process, and return whether it is current. One caller rebuilds
+    while the others keep searching the old copy and get False, so their
+    results are not cached.
+    """
+    generation = generations.shared(db, models.Candidate.__tablename__)
+    if candidate_lexical_index.ready and candidate_lexical_index.generation == generation:
+        return True
+    if not _refresh_lock.acquire(blocking=not candidate_lexical_index.ready):
+        return False
+    try:
+        if not candidate_lexical_index.ready or candidate_lexical_index.generation != generation:
+            build_lexical_index(db)
+    finally:
+        _refresh_lock.release()
+    return True
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_lexical_changes(session, flush_context):
+    pending = session.info.setdefault("lexical_index_ops", [])
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, models.Candidate):
+            active = obj.is_active is not False
+            terms = candidate_terms(*(getattr(obj, field) for field in _CANDIDATE_FIELDS)) if active else None
+            pending.append((obj.id, terms))
+    for obj in session.deleted:
+        if isinstance(obj, models.Candidate):
+            pending.append((obj.id, None))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_lexical_changes(session):
+    ops = session.info.pop("lexical_index_ops", [])
+    if ops:
+        candidate_lexical_index.apply(ops, generations.committed(session, models.Candidate.__tablename__))
+        generations.bump(models.Candidate.__tablename__)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_lexical_changes(session):
+    session.info.pop("lexical_index_ops", None)
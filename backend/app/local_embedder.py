@@ -0,0 +1,59 @@
+"""
+Deterministic in-process embedder used when the Gemini API is unavailable.
+
+Feature hashing: words, word bigrams and in-word character trigrams are
+hashed into the configured number of dimensions with a signed hash,
+weighted by sublinear term frequency and L2-normalized. It needs no model
+or vocabulary and produces vectors of the same size as the remote model,
+so they can be stored and indexed like any other vector. Its space is
+unrelated to Gemini's, which is why stored vectors are tagged with the
+embedder that produced them and re-embedded once the API is back.
+"""
+import hashlib
+import math
+import re
+from collections import Counter
+import numpy as np
+from .vector import EMBEDDING_DIMENSIONS, normalize
+
+LOCAL_EMBEDDER = "local-hash-v1"
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+_TRIGRAM_WEIGHT = 0.5
+
+
+def _features(text: str) -> Counter:
+    words = [word.rstrip(".") for word in _TOKEN.findall((text or "").lower())]
+    words = [word for word in words if word]
+    features = Counter(words)
+    features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    for word in words:
+        if len(word) > 3:
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                features[f"#{padded[i:i + 3]}"] += _TRIGRAM_WEIGHT
+    return features
+
+
+def _bucket(feature: str, dimensions: int) -> tuple[int, float]:
+    digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return (digest >> 1) % dimensions, (1.0 if digest & 1 else -1.0)
+
+
+def hashing_embed(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> list:
+    """Embed one text; empty or token-less text gives an empty list."""
+    features = _features(text)
+    if not features:
+        return []
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for feature, count in features.items():
+        index, sign = _bucket(feature, dimensions)
+        weight = 1.0 + math.log(count) if count > 1 else count
+        vector[index] += sign * weight
+    vector = normalize(vector)
+    return vector.tolist() if vector.any() else []
+
+
+def hashing_embed_many(texts: list, dimensions: int = EMBEDDING_DIMENSIONS) -> list:
+    """Embed several texts, e.g. the ones Gemini failed on in one batch."""
+    return [hashing_embed(text, dimensions) for text in texts]
@@ -1,6 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .database import Base, engine
+from .database import Base, engine, SessionLocal
+from .vector_index import build_indexes
+from .lexical_index import build_lexical_index
+from .candidate_store import build_candidate_store
+from .match_scoring import build_project_matrix
 from .routers import users, projects, ai, auth, matching, profile, repo_projects, chat, requirements, analyze_repo, talent, skill_gap
 
 Base.metadata.create_all(bind=engine)
@@ -13,8 +17,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+
+@app.on_event("startup")
+def load_vector_indexes():
+    db = SessionLocal()
+    try:
+        build_indexes(db)
+        build_lexical_index(db)
+        build_candidate_store(db)
+        build_project_matrix(db)
+    finally:
+        db.close()
+
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(projects.router)
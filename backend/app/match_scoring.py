@@ -0,0 +1,336 @@
+"""
+User-to-project match scoring shared by /matching/discover and the
+per-user discover queues.
+
+calculate_match_score scores one (user, project) pair, comparing skill ids
+from skills.py so synonyms and case differences still overlap.
+ProjectMatrix holds every active project with its skills, languages and
+frameworks as bits of those ids packed into uint64 bitsets, so one user is scored against
+all projects in a single vectorized pass: set overlaps become popcounts of
+ANDed bitsets. It applies the same weights in the same order, so its scores
+are bit-identical to calculate_match_score (check_match_scores.py verifies
+this). Like the indexes, it is built at startup and kept in sync by
+session hooks.
+"""
+import os
+import threading
+import time
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from . import generations, models
+from .skills import skill_ids
+
+PROFILE_FIELDS = ("skills", "top_languages", "top_frameworks")
+STREAM_BATCH_SIZE = 1000
+# The project matrix is reloaded this often to pick up projects written by
+# other workers, which its session hooks never see
+PROJECT_MATRIX_TTL = float(os.getenv("PROJECT_MATRIX_TTL", "300"))
+
+MATCH_WEIGHTS = {
+    'skills': 0.4,
+    'languages': 0.3,
+    'frameworks': 0.2,
+    'complexity': 0.1
+}
+# (project attribute, user attribute, weight key) of the overlap terms, in scoring order
+OVERLAP_FIELDS = (
+    ("skills", "skills", "skills"),
+    ("languages", "top_languages", "languages"),
+    ("frameworks", "top_frameworks", "frameworks"),
+)
+
+
+def match_strength(score: float) -> str:
+    if score >= 0.7:
+        return "strong"
+    if score >= 0.4:
+        return "likely"
+    return "weak"
+
+
+def calculate_match_score(user, project) -> tuple[float, str]:
+    """
+    Calculate match score between user and project based on skills, languages, and frameworks.
+    Returns (score, match_strength) where:
+    - score: 0.0 to 1.0
+    - match_strength: "strong" (>0.7), "likely" (0.4-0.7), "weak" (<0.4)
+    Only attributes are read (user: skills, top_languages, top_frameworks;
+    project: skills, languages, frameworks, complexity), so ORM rows,
+    column-projected rows and snapshots all work.
+    """
+    score = 0.0
+    weights = MATCH_WEIGHTS
+    
+    # Skills match
+    user_skills = skill_ids(user.skills)
+    project_skills = skill_ids(project.skills)
+    if user_skills and project_skills:
+        skills_overlap = len(user_skills.intersection(project_skills))
+        skills_score = min(1.0, skills_overlap / max(len(project_skills), 1))
+        score += skills_score * weights['skills']
+    
+    # Languages match
+    user_languages = skill_ids(user.top_languages)
+    project_languages = skill_ids(project.languages)
+    if user_languages and project_languages:
+        lang_overlap = len(user_languages.intersection(project_languages))
+        lang_score = min(1.0, lang_overlap / max(len(project_languages), 1))
+        score += lang_score * weights['languages']
+    
+    # Frameworks match
+    user_frameworks = skill_ids(user.top_frameworks)
+    project_frameworks = skill_ids(project.frameworks)
+    if user_frameworks and project_frameworks:
+        framework_overlap = len(user_frameworks.intersection(project_frameworks))
+        framework_score = min(1.0, framework_overlap / max(len(project_frameworks), 1))
+        score += framework_score * weights['frameworks']
+    
+    # Complexity bonus (if user has many skills, they can handle complex projects)
+    user_skill_count = len(user_skills)
+    if project.complexity == "advanced" and user_skill_count >= 5:
+        score += weights['complexity']
+    elif project.complexity == "intermediate" and user_skill_count >= 3:
+        score += weights['complexity'] * 0.7
+    elif project.complexity == "beginner":
+        score += weights['complexity'] * 0.5
+    
+    return score, match_strength(score)
+
+
+# Complexity codes of the bonus lookup in ProjectMatrix.score
+COMPLEXITY_CODES = {"beginner": 1, "intermediate": 2, "advanced": 3}
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(words: np.ndarray) -> np.ndarray:
+        """Set bits per row of a 2-D uint64 array."""
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+else:
+    _POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words: np.ndarray) -> np.ndarray:
+        """Set bits per row of a 2-D uint64 array (NumPy < 2.0 fallback)."""
+        return _POPCOUNT8[words.view(np.uint8)].sum(axis=1, dtype=np.int64)
+
+
+class ProjectMatrix:
+    """Active projects as per-field packed bitsets over the skill ids they use."""
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._lock = threading.RLock()
+        self.terms: dict[int, int] = {}  # skill id -> bit
+        self._words = 1  # uint64 words per bitset
+        self._ids = np.zeros(initial_capacity, dtype=np.int64)
+        self._owners = np.zeros(initial_capacity, dtype=np.int64)
+        self._complexity = np.zeros(initial_capacity, dtype=np.int8)
+        self._bits = {field: np.zeros((initial_capacity, 1), dtype=np.uint64) for field, _, _ in OVERLAP_FIELDS}
+        self._sizes = {field: np.zeros(initial_capacity, dtype=np.int32) for field, _, _ in OVERLAP_FIELDS}
+        self._rows: dict[int, int] = {}
+        self._size = 0
+        self._replay: list | None = None  # writes made while a rebuild loads its rows
+        self.ready = False
+        self.built_at = 0.0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, project_id: int) -> bool:
+        return project_id in self._rows
+
+    def _columns(self) -> list:
+        return [self._ids, self._owners, self._complexity, *self._bits.values(), *self._sizes.values()]
+
+    def _reserve(self, capacity: int) -> None:
+        if capacity <= self._ids.shape[0]:
+            return
+        new_capacity = max(capacity, self._ids.shape[0] * 2)
+
+        def grow(column):
+            grown = np.zeros((new_capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[: self._size] = column[: self._size]
+            return grown
+
+        self._ids, self._owners, self._complexity = grow(self._ids), grow(self._owners), grow(self._complexity)
+        self._bits = {field: grow(bits) for field, bits in self._bits.items()}
+        self._sizes = {field: grow(sizes) for field, sizes in self._sizes.items()}
+
+    def _intern(self, skill: int) -> int:
+        term_id = self.terms.get(skill)
+        if term_id is None:
+            term_id = self.terms[skill] = len(self.terms)
+            if term_id >= self._words * 64:
+                # Double the bitset width for the larger vocabulary
+                words = self._words * 2
+                for field, bits in self._bits.items():
+                    wider = np.zeros((bits.shape[0], words), dtype=np.uint64)
+                    wider[:, : self._words] = bits
+                    self._bits[field] = wider
+                self._words = words
+        return term_id
+
+    def _bitset(self, term_ids) -> np.ndarray:
+        words = np.zeros(self._words, dtype=np.uint64)
+        for term_id in term_ids:
+            words[term_id >> 6] |= np.uint64(1) << np.uint64(term_id & 63)
+        return words
+
+    def upsert(self, project_id: int, owner_id, skills, languages, frameworks, complexity) -> None:
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append((project_id, (owner_id, skills, languages, frameworks, complexity)))
+            values = {"skills": skills, "languages": languages, "frameworks": frameworks}
+            term_ids = {field: {self._intern(skill) for skill in skill_ids(values[field])} for field in values}
+            row = self._rows.get(project_id)
+            if row is None:
+                self._reserve(self._size + 1)
+                row = self._size
+                self._size += 1
+                self._rows[project_id] = row
+                self._ids[row] = project_id
+            self._owners[row] = owner_id if owner_id is not None else -1
+            self._complexity[row] = COMPLEXITY_CODES.get(complexity, 0)
+            for field, ids in term_ids.items():
+                self._bits[field][row] = self._bitset(ids)
+                self._sizes[field][row] = len(ids)
+
+    def remove(self, project_id: int) -> None:
+        """Drop a row by moving the last row into its slot."""
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append((project_id, None))
+            row = self._rows.pop(project_id, None)
+            if row is None:
+                return
+            last = self._size - 1
+            if row != last:
+                for column in self._columns():
+                    column[row] = column[last]
+                self._rows[int(self._ids[row])] = row
+            self._size = last
+
+    def build(self, rows) -> None:
+        """
+        Replace the contents with (id, owner_id, skills, languages,
+        frameworks, complexity) rows. They are loaded into a new matrix
+        without holding the lock, so scoring and writes carry on against
+        the current contents meanwhile; writes made during the load are
+        replayed onto the new matrix before it is swapped in.
+        """
+        loaded = ProjectMatrix()
+        with self._lock:
+            self._replay = []
+        try:
+            for project_id, *fields in rows:
+                loaded.upsert(int(project_id), *fields)
+        except BaseException:
+            with self._lock:
+                self._replay = None
+            raise
+        with self._lock:
+            for project_id, fields in self._replay:
+                if fields is None:
+                    loaded.remove(project_id)
+                else:
+                    loaded.upsert(project_id, *fields)
+            self._replay = None
+            for attr in ("terms", "_words", "_ids", "_owners", "_complexity", "_bits", "_sizes", "_rows", "_size"):
+                setattr(self, attr, getattr(loaded, attr))
+            self.ready = True
+            self.built_at = time.monotonic()
+
+    def score(self, user, exclude_owner: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (project ids, scores) of every project for one user, equal to
+        calculate_match_score(user, project)[0] for each project, skipping
+        projects owned by exclude_owner.
+        """
+        with self._lock:
+            n = self._size
+            scores = np.zeros(n, dtype=np.float64)
+            for field, user_field, weight in OVERLAP_FIELDS:
+                user_skills = skill_ids(getattr(user, user_field))
+                if not user_skills:
+                    continue
+                sizes = self._sizes[field][:n]
+                # Skills no project uses cannot overlap, so they need no bit
+                user_bits = self._bitset(self.terms[skill] for skill in user_skills if skill in self.terms)
+                overlap = _popcount(self._bits[field][:n] & user_bits)
+                ratio = np.minimum(1.0, overlap / np.maximum(sizes, 1))
+                scores += np.where(sizes > 0, ratio * MATCH_WEIGHTS[weight], 0.0)
+            user_skill_count = len(skill_ids(user.skills))
+            bonus = np.array([
+                0.0,
+                MATCH_WEIGHTS['complexity'] * 0.5,
+                MATCH_WEIGHTS['complexity'] * 0.7 if user_skill_count >= 3 else 0.0,
+                MATCH_WEIGHTS['complexity'] if user_skill_count >= 5 else 0.0,
+            ])
+            scores += bonus[self._complexity[:n]]
+            ids = self._ids[:n]
+            if exclude_owner is not None:
+                keep = self._owners[:n] != exclude_owner
+                ids, scores = ids[keep], scores[keep]
+            return ids.copy(), scores
+
+
+project_matrix = ProjectMatrix()
+
+_PROJECT_FIELDS = ("owner_id", "skills", "languages", "frameworks", "complexity")
+
+
+def build_project_matrix(db: Session) -> None:
+    """Load every active project's scoring attributes."""
+    rows = (
+        db.query(models.Project.id, *(getattr(models.Project, field) for field in _PROJECT_FIELDS))
+        .filter(models.Project.is_active == True)
+        .yield_per(STREAM_BATCH_SIZE)
+    )
+    project_matrix.build(rows)
+    print(f"Built project match matrix with {len(project_matrix)} rows and {len(project_matrix.terms)} terms")
+
+
+_refresh_lock = threading.Lock()
+
+
+def ensure_project_matrix(db: Session) -> None:
+    """
+    Build the project matrix if needed, or rebuild it once it is older than
+    PROJECT_MATRIX_TTL; one caller rebuilds while the others keep using the
+    current copy.
+    """
+    if project_matrix.ready and time.monotonic() - project_matrix.built_at < PROJECT_MATRIX_TTL:
+        return
+    if _refresh_lock.acquire(blocking=not project_matrix.ready):
+        try:
+            if not project_matrix.ready or time.monotonic() - project_matrix.built_at >= PROJECT_MATRIX_TTL:
+                build_project_matrix(db)
+        finally:
+            _refresh_lock.release()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_matrix_changes(session, flush_context):
+    pending = session.info.setdefault("project_matrix_ops", [])
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, models.Project):
+            fields = tuple(getattr(obj, field) for field in _PROJECT_FIELDS) if obj.is_active is not False else None
+            pending.append((obj.id, fields))
+    for obj in session.deleted:
+        if isinstance(obj, models.Project):
+            pending.append((obj.id, None))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_matrix_changes(session):
+    ops = session.info.pop("project_matrix_ops", [])
+    for project_id, fields in ops:
+        if fields is None:
+            project_matrix.remove(project_id)
+        else:
+            project_matrix.upsert(project_id, *fields)
+    if ops:
+        generations.bump(models.Project.__tablename__)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_matrix_changes(session):
+    session.info.pop("project_matrix_ops", None)
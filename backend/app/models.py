@@ -9,11 +9,23 @@ from sqlalchemy import (
     Index,
     UniqueConstraint,
     JSON,
+    LargeBinary,
+    and_,
+    event,
+    insert,
+    select,
+    text,
+    update,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.orm import Session, relationship, validates
 from sqlalchemy.sql import func
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import JSONB, array
 from .database import Base, is_postgres
+from .skills import canonical_skills
+from .vector import EMBEDDING_DIMENSIONS, validate_vector
+import json
+import numpy as np
 
 
 def json_column():
@@ -25,15 +37,83 @@ def json_column():
         return Column(JSON)
 
 
-def vector_column(dimensions=768):
-    """Helper to create vector column for PostgreSQL or JSON for SQLite"""
+def json_contains_all(column, values):
+    """
+    SQL condition: the JSON array in column contains every one of values.
+    JSONB containment (@>) on PostgreSQL, served by the GIN indexes;
+    one json_each() lookup per value on SQLite.
+    """
+    if is_postgres:
+        return column.contains(list(values))
+    conditions = []
+    for value in values:
+        elements = func.json_each(column).table_valued("value")
+        conditions.append(select(1).select_from(elements).where(elements.c.value == value).exists())
+    return and_(*conditions)
+
+
+def json_contains_any(column, values):
+    """
+    SQL condition: the JSON array in column contains at least one of
+    values. JSONB ?| on PostgreSQL (GIN-indexed), json_each() on SQLite.
+    """
+    values = list(values)
+    if is_postgres:
+        return column.has_any(array(values))
+    elements = func.json_each(column).table_valued("value")
+    return select(1).select_from(elements).where(elements.c.value.in_(values)).exists()
+
+
+def vector_index(name, column):
+    """HNSW cosine index over the active rows of a pgvector column"""
+    return Index(
+        name,
+        column,
+        postgresql_using="hnsw",
+        postgresql_with={"m": 16, "ef_construction": 64},
+        postgresql_ops={column: "vector_cosine_ops"},
+        postgresql_where=text("is_active"),
+    )
+
+
+class Float32Vector(TypeDecorator):
+    """
+    Stores a vector as a packed little-endian float32 BLOB and loads it
+    zero-copy as a read-only numpy array. Rows still holding the legacy
+    JSON text are decoded until the migration has converted them.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return np.asarray(value, dtype="<f4").reshape(-1).tobytes()
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            values = json.loads(value)
+            return None if values is None else np.asarray(values, dtype=np.float32)
+        return np.frombuffer(value, dtype="<f4")
+
+    def compare_values(self, x, y):
+        if x is None or y is None:
+            return x is y
+        return np.array_equal(np.asarray(x, dtype=np.float32), np.asarray(y, dtype=np.float32))
+
+
+def vector_column(dimensions=EMBEDDING_DIMENSIONS):
+    """Helper to create vector column for PostgreSQL or float32 BLOB for SQLite"""
     if is_postgres:
         from pgvector.sqlalchemy import Vector
 
         return Column(Vector(dimensions))
     else:
-        # For SQLite, store vectors as JSON arrays
-        return Column(JSON)
+        # For SQLite, store vectors as packed float32 BLOBs
+        return Column(Float32Vector)
 
 
 class User(Base):
@@ -58,7 +138,9 @@ class User(Base):
     activity_score = Column(Integer)
     top_languages = json_column()
     top_frameworks = json_column()
-    user_vector = vector_column(768)
+    user_vector = vector_column()
+    embedding_fingerprint = Column(String(64))
+    embedder = Column(String)  # model that produced the vector, e.g. local-hash-v1
 
     # Relationships
     projects = relationship(
@@ -77,10 +159,19 @@ class User(Base):
             Index("idx_user_skills", "skills", postgresql_using="gin"),
             Index("idx_user_languages", "top_languages", postgresql_using="gin"),
             Index("idx_active_created", "is_active", "created_at"),
+            vector_index("idx_user_vector_hnsw", "user_vector"),
         )
     else:
         __table_args__ = (Index("idx_active_created", "is_active", "created_at"),)
 
+    @validates("user_vector")
+    def validate_user_vector(self, key, value):
+        return validate_vector(value)
+
+    @validates("skills", "top_languages", "top_frameworks")
+    def validate_skills(self, key, value):
+        return canonical_skills(value)
+
 
 class Project(Base):
     __tablename__ = "projects"
@@ -103,7 +194,9 @@ class Project(Base):
     is_active = Column(Boolean, default=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    project_vector = vector_column(768)
+    project_vector = vector_column()
+    embedding_fingerprint = Column(String(64))
+    embedder = Column(String)
 
     # Denormalized fields for performance
     match_count = Column(Integer, default=0)
@@ -123,6 +216,7 @@ class Project(Base):
             Index("idx_project_languages", "languages", postgresql_using="gin"),
             Index("idx_active_owner", "is_active", "owner_id"),
             Index("idx_created_active", "created_at", "is_active"),
+            vector_index("idx_project_vector_hnsw", "project_vector"),
         )
     else:
         __table_args__ = (
@@ -130,6 +224,14 @@ class Project(Base):
             Index("idx_created_active", "created_at", "is_active"),
         )
 
+    @validates("project_vector")
+    def validate_project_vector(self, key, value):
+        return validate_vector(value)
+
+    @validates("skills", "languages", "frameworks")
+    def validate_skills(self, key, value):
+        return canonical_skills(value)
+
 
 class Swipe(Base):
     __tablename__ = "swipes"
@@ -207,7 +309,9 @@ class Candidate(Base):
     certifications = json_column()
     education = json_column()
     summary = Column(Text)
-    candidate_vector = vector_column(768)
+    candidate_vector = vector_column()
+    embedding_fingerprint = Column(String(64))
+    embedder = Column(String)
     is_active = Column(Boolean, default=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -220,13 +324,23 @@ class Candidate(Base):
     if is_postgres:
         __table_args__ = (
             Index("idx_candidate_skills", "skills", postgresql_using="gin"),
+            Index("idx_candidate_certifications", "certifications", postgresql_using="gin"),
             Index("idx_experience_active", "experience_years", "is_active"),
+            vector_index("idx_candidate_vector_hnsw", "candidate_vector"),
         )
     else:
         __table_args__ = (
             Index("idx_experience_active", "experience_years", "is_active"),
         )
 
+    @validates("candidate_vector")
+    def validate_candidate_vector(self, key, value):
+        return validate_vector(value)
+
+    @validates("skills")
+    def validate_skills(self, key, value):
+        return canonical_skills(value)
+
 
 class SkillGapAnalysis(Base):
     __tablename__ = "skill_gap_analyses"
@@ -257,3 +371,68 @@ class SkillGapAnalysis(Base):
         Index("idx_candidate_score", "candidate_id", "readiness_score"),
         Index("idx_role_score", "target_role", "readiness_score"),
     )
+
+
+class EmbeddingCache(Base):
+    """
+    Persistent embedding cache keyed by a fingerprint of (document, model,
+    dimensions), so an unchanged document is never sent to the model twice.
+    """
+
+    __tablename__ = "embedding_cache"
+
+    fingerprint = Column(String(64), primary_key=True)
+    model = Column(String, nullable=False)
+    dimensions = Column(Integer, nullable=False)
+    vector = vector_column()
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TableGeneration(Base):
+    """
+    Write counter of a table, bumped in the same transaction as every write
+    to its rows, so every worker and instance sees the same value (see
+    generations.py).
+    """
+
+    __tablename__ = "table_generations"
+
+    name = Column(String, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+
+
+# Tables whose writes bump their TableGeneration row
+SHARED_GENERATION_TABLES = frozenset({Candidate.__tablename__})
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_table_generations(session, flush_context):
+    tables = {
+        obj.__tablename__
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if getattr(obj, "__tablename__", None) in SHARED_GENERATION_TABLES
+    }
+    generations = TableGeneration.__table__
+    connection = session.connection()
+    spans = session.info.setdefault("table_generations", {})
+    for table in sorted(tables):
+        result = connection.execute(
+            update(generations).where(generations.c.name == table).values(generation=generations.c.generation + 1)
+        )
+        if not result.rowcount:
+            connection.execute(insert(generations).values(name=table, generation=1))
+        generation = connection.execute(select(generations.c.generation).where(generations.c.name == table)).scalar()
+        # (generation before this transaction, generation after it)
+        spans[table] = (spans[table][0] if table in spans else generation - 1, generation)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_table_generations(session):
+    session.info.pop("table_generations", None)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _end_table_generations(session, transaction):
+    # after_commit hooks have run by now
+    if transaction.parent is None:
+        session.info.pop("table_generations", None)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 from .. import models, auth
 from ..gemini_agent import analyze_repo, refine_pitch, get_project_requirements_questions, process_project_requirements, generate_project_template, semantic_search_projects
+from ..embeddings import query_cache, dispatcher
 
 router = APIRouter(prefix="/ai", tags=["AI"])
 
@@ -40,3 +41,13 @@ def search_projects(request: dict, current_user: models.User = Depends(auth.get_
     query = request.get("query", "")
     filters = request.get("filters", {})
     return semantic_search_projects(query, filters)
+
+@router.get("/embedding-cache")
+def embedding_cache_stats(current_user: models.User = Depends(auth.get_current_user)):
+    """Hit/miss counters of the query-embedding cache"""
+    return query_cache.stats()
+
+@router.get("/embedding-dispatcher")
+def embedding_dispatcher_stats(current_user: models.User = Depends(auth.get_current_user)):
+    """Batching metrics of the embedding dispatcher"""
+    return dispatcher.stats()
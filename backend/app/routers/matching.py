@@ -1,143 +1,63 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
+from sqlalchemy.dialects import postgresql, sqlite
 from .. import schemas, models, auth
-from ..database import get_db
+from ..database import get_db, is_postgres
+from ..discover_queue import discover_queues, record_swipes
+from ..match_scoring import STREAM_BATCH_SIZE
+from ..skills import skill_ids
+from ..vector_index import project_index
+from typing import List, Optional
+import heapq
 import random
 
 router = APIRouter(prefix="/matching", tags=["Matching"])
 
-def calculate_match_score(user: models.User, project: models.Project) -> tuple[float, str]:
-    """
-    Calculate match score between user and project based on skills, languages, and frameworks.
-    Returns (score, match_strength) where:
-    - score: 0.0 to 1.0
-    - match_strength: "strong" (>0.7), "likely" (0.4-0.7), "weak" (<0.4)
-    """
-    score = 0.0
-    weights = {
-        'skills': 0.4,
-        'languages': 0.3,
-        'frameworks': 0.2,
-        'complexity': 0.1
-    }
-    
-    # Skills match
-    user_skills = set(user.skills or [])
-    project_skills = set(project.skills or [])
-    if user_skills and project_skills:
-        skills_overlap = len(user_skills.intersection(project_skills))
-        skills_score = min(1.0, skills_overlap / max(len(project_skills), 1))
-        score += skills_score * weights['skills']
-    
-    # Languages match
-    user_languages = set(user.top_languages or [])
-    project_languages = set(project.languages or [])
-    if user_languages and project_languages:
-        lang_overlap = len(user_languages.intersection(project_languages))
-        lang_score = min(1.0, lang_overlap / max(len(project_languages), 1))
-        score += lang_score * weights['languages']
-    
-    # Frameworks match
-    user_frameworks = set(user.top_frameworks or [])
-    project_frameworks = set(project.frameworks or [])
-    if user_frameworks and project_frameworks:
-        framework_overlap = len(user_frameworks.intersection(project_frameworks))
-        framework_score = min(1.0, framework_overlap / max(len(project_frameworks), 1))
-        score += framework_score * weights['frameworks']
-    
-    # Complexity bonus (if user has many skills, they can handle complex projects)
-    user_skill_count = len(user.skills or [])
-    if project.complexity == "advanced" and user_skill_count >= 5:
-        score += weights['complexity']
-    elif project.complexity == "intermediate" and user_skill_count >= 3:
-        score += weights['complexity'] * 0.7
-    elif project.complexity == "beginner":
-        score += weights['complexity'] * 0.5
-    
-    # Determine match strength
-    if score >= 0.7:
-        match_strength = "strong"
-    elif score >= 0.4:
-        match_strength = "likely"
-    else:
-        match_strength = "weak"
-    
-    return score, match_strength
 @router.get("/discover", response_model=schemas.ProjectResponse)
 def get_next_project(
+    exclude_project_id: Optional[int] = None,
     current_user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
-    # -------- NEW PROJECTS (never swiped) --------
-    new_candidates = (
-        db.query(models.Project)
-        .filter(
-            models.Project.owner_id != current_user.id,
-            models.Project.is_active == True,
-            ~db.query(models.Swipe)
-            .filter(
-                models.Swipe.user_id == current_user.id,
-                models.Swipe.project_id == models.Project.id
-            )
-            .exists()
-        )
-        .all()
-    )
+    # Never-swiped projects first, then passed (not liked) ones as reshows,
+    # served from the user's precomputed queue
+    hit = discover_queues.next(db, current_user, exclude=exclude_project_id)
+    if hit is None:
+        raise HTTPException(status_code=404, detail="No more projects to discover")
 
-    if new_candidates:
-        scored = []
-        for project in new_candidates:
-            score, strength = calculate_match_score(current_user, project)
-            scored.append((project, score, strength))
+    project, score, strength, is_reshow = hit
+    project.is_reshow = is_reshow
+    project.match_score = score
+    project.match_strength = strength
+    return project
 
-        scored.sort(key=lambda x: (x[1], -x[0].id), reverse=True)
-        project, score, strength = scored[0]
 
-        project.is_reshow = False
+@router.get("/discover/batch", response_model=list[schemas.ProjectResponse])
+def get_next_projects(
+    n: int = Query(10, ge=1, le=50),
+    exclude_project_id: List[int] = Query([]),
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    # The next n cards in /discover order in one round trip, so the client
+    # can prefetch while the user swipes. Cards it still holds can be
+    # excluded by repeating exclude_project_id.
+    projects = []
+    for project, score, strength, is_reshow in discover_queues.next_batch(
+        db, current_user, n, exclude=exclude_project_id
+    ):
+        project.is_reshow = is_reshow
         project.match_score = score
         project.match_strength = strength
-        return project
-
-    # -------- PASSED PROJECTS (reshow only if NOT liked) --------
-    passed_candidates = (
-        db.query(models.Project)
-        .filter(
-            models.Project.owner_id != current_user.id,
-            models.Project.is_active == True,
-            db.query(models.Swipe)
-            .filter(
-                models.Swipe.user_id == current_user.id,
-                models.Swipe.project_id == models.Project.id,
-                models.Swipe.is_like == False,
-            )
-            .exists(),
-            ~db.query(models.Swipe)
-            .filter(
-                models.Swipe.user_id == current_user.id,
-                models.Swipe.project_id == models.Project.id,
-                models.Swipe.is_like == True,
-            )
-            .exists(),
-        )
-        .all()
-    )
-
-    if passed_candidates:
-        scored = []
-        for project in passed_candidates:
-            score, strength = calculate_match_score(current_user, project)
-            scored.append((project, score, strength))
+        projects.append(project)
+    return projects
 
-        scored.sort(key=lambda x: (x[1], -x[0].id), reverse=True)
-        project, score, strength = scored[0]
 
-        project.is_reshow = True
-        project.match_score = score
-        project.match_strength = strength
-        return project
-
-    raise HTTPException(status_code=404, detail="No more projects to discover")
+@router.get("/discover-queues")
+def discover_queue_stats(current_user: models.User = Depends(auth.get_current_user)):
+    """Size and build/serve counters of the per-user discover queues"""
+    return discover_queues.stats()
 
 
 @router.post("/swipe", response_model=schemas.SwipeResponse)
@@ -174,6 +94,50 @@ def swipe_project(
     
     return db_swipe
 
+@router.post("/swipes", response_model=list[schemas.SwipeResult])
+def swipe_projects(
+    batch: schemas.SwipeBatch,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Bulk /swipe for clients replaying queued swipes: one query validates
+    # the project ids, one INSERT .. ON CONFLICT DO NOTHING against
+    # uq_user_project_swipe writes them, all in one transaction
+    project_ids = {swipe.project_id for swipe in batch.swipes}
+    existing = {
+        project_id for (project_id,) in
+        db.query(models.Project.id).filter(models.Project.id.in_(project_ids))
+    }
+    first = {}  # project id -> index of its first swipe in the batch
+    for i, swipe in enumerate(batch.swipes):
+        if swipe.project_id in existing:
+            first.setdefault(swipe.project_id, i)
+    
+    created = {}
+    if first:
+        insert = postgresql.insert if is_postgres else sqlite.insert
+        statement = insert(models.Swipe).values([
+            {"user_id": current_user.id, "project_id": batch.swipes[i].project_id, "is_like": batch.swipes[i].is_like}
+            for i in first.values()
+        ]).on_conflict_do_nothing(
+            index_elements=["user_id", "project_id"]
+        ).returning(models.Swipe.id, models.Swipe.project_id, models.Swipe.is_like)
+        rows = db.execute(statement).all()
+        created = {project_id: swipe_id for swipe_id, project_id, _ in rows}
+        record_swipes(db, [(current_user.id, project_id, bool(is_like)) for _, project_id, is_like in rows])
+        db.commit()
+    
+    results = []
+    for i, swipe in enumerate(batch.swipes):
+        if swipe.project_id not in existing:
+            status, swipe_id = "project_not_found", None
+        elif first[swipe.project_id] == i and swipe.project_id in created:
+            status, swipe_id = "created", created[swipe.project_id]
+        else:
+            status, swipe_id = "already_swiped", None
+        results.append(schemas.SwipeResult(project_id=swipe.project_id, is_like=swipe.is_like, status=status, id=swipe_id))
+    return results
+
 @router.get("/matches", response_model=list[schemas.MatchResponse])
 def get_matches(
     current_user: models.User = Depends(auth.get_current_user),
@@ -277,30 +241,27 @@ def get_recommendations(
     db: Session = Depends(get_db)
 ):
     # Prefer embedding-based similarity when vectors exist
-    def cosine(a, b):
-        try:
-            import math
-            if not a or not b or len(a) != len(b):
-                return 0.0
-            sa = sum(x*x for x in a)
-            sb = sum(y*y for y in b)
-            if sa == 0 or sb == 0:
-                return 0.0
-            dot = sum(x*y for x,y in zip(a,b))
-            return max(0.0, min(1.0, dot / (math.sqrt(sa)*math.sqrt(sb))))
-        except Exception:
-            return 0.0
-
-    user_vec = current_user.user_vector or []
-    projects = db.query(models.Project).filter(models.Project.is_active == True, models.Project.owner_id != current_user.id).all()
-    if user_vec and projects and any(p.project_vector for p in projects):
-        scored = [(p, cosine(user_vec, p.project_vector or [])) for p in projects]
-        scored.sort(key=lambda t: t[1], reverse=True)
-        return [p for p,_ in scored[:10]]
-    # Fallback: skill overlap
-    user_skills = set(current_user.skills or [])
-    projects.sort(key=lambda p: len(user_skills.intersection(set(p.skills or []))), reverse=True)
-    return projects[:10]
+    own_project_ids = {
+        project_id for (project_id,) in
+        db.query(models.Project.id).filter(models.Project.owner_id == current_user.id)
+    }
+    hits = project_index.search(current_user.user_vector, k=10, exclude=own_project_ids, db=db)
+    if hits:
+        projects = db.query(models.Project).filter(
+            models.Project.id.in_([project_id for project_id, _ in hits]),
+            models.Project.is_active == True
+        ).all()
+        projects_by_id = {p.id: p for p in projects}
+        return [projects_by_id[project_id] for project_id, _ in hits if project_id in projects_by_id]
+    # Fallback: skill overlap, scored on (id, skills) only
+    user_skills = skill_ids(current_user.skills)
+    rows = db.query(models.Project.id, models.Project.skills).filter(
+        models.Project.is_active == True, models.Project.owner_id != current_user.id
+    ).yield_per(STREAM_BATCH_SIZE)
+    overlaps = [(len(user_skills & skill_ids(skills)), project_id) for project_id, skills in rows]
+    top_ids = [project_id for _, project_id in heapq.nsmallest(10, overlaps, key=lambda hit: (-hit[0], hit[1]))]
+    projects_by_id = {p.id: p for p in db.query(models.Project).filter(models.Project.id.in_(top_ids))}
+    return [projects_by_id[project_id] for project_id in top_ids]
 
 @router.get("/my-projects/likes", response_model=list[schemas.OwnerMatchItem])
 def get_likes_on_my_projects(
@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from .. import schemas, models, auth
 from ..database import get_db
-from ..gemini_agent import analyze_user_repos, embed_text
+from ..gemini_agent import analyze_user_repos
+from ..embeddings import refresh_embedding
 import requests
 
 router = APIRouter(prefix="/profile", tags=["Profile"])
@@ -43,8 +44,7 @@ def setup_profile(
     current_user.top_languages = ai.get("core_skills") or []
     # Compute user embedding vector
     try:
-        vec_text = f"{current_user.name} {current_user.bio} {' '.join(current_user.skills or [])} {' '.join(current_user.top_languages or [])}"
-        current_user.user_vector = embed_text(vec_text)
+        refresh_embedding(db, current_user)
     except Exception:
         pass
     current_user.activity_score = 70  # simple placeholder; compute via GitHub later
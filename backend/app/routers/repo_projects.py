@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from .. import schemas, models, auth, crud
 from ..database import get_db
-from ..gemini_agent import analyze_repo_url, embed_text, analyze_project_repo
+from ..gemini_agent import analyze_repo_url, analyze_project_repo
+from ..embeddings import refresh_embedding
 import requests
 
 router = APIRouter(prefix="/repo", tags=["Repo"])
@@ -56,11 +58,9 @@ async def create_project_from_repo(
     created = crud.create_project(db, project, owner_id=current_user.id)
     # Compute and store project embedding for semantic matching
     try:
-        # embed_text is sync, but lightweight-ish api call. 
-        # For full async, we should make it async too or run in executor.
-        # Keeping it simple for now, as it's not the crash reason.
-        vector = embed_text(f"{created.title}\n{created.summary}\n{' '.join(created.languages or [])} {' '.join(created.frameworks or [])}")
-        created.project_vector = vector
+        # refresh_embedding blocks on the embedding dispatcher, so it runs in
+        # the threadpool to keep the event loop free
+        await run_in_threadpool(refresh_embedding, db, created)
         db.add(created)
         db.commit()
         db.refresh(created)
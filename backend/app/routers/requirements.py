@@ -3,8 +3,10 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from .. import schemas, models, auth
 from ..database import get_db
-from ..gemini_agent import refine_pitch, embed_text
-import math
+from ..gemini_agent import refine_pitch
+from ..embeddings import embed_query
+from ..skills import TextSkills, skill_ids
+from ..vector_index import user_index
 
 router = APIRouter(prefix="/requirements", tags=["Requirements"])
 
@@ -44,82 +46,70 @@ def analyze_requirements(
             print(f"Gemini refine_pitch failed: {e}")
             refined_text = data.requirements  # Fallback to original text
         
-        # Create embedding for the requirements
+        # Create embedding for the requirements; never a local one, which
+        # means nothing against Gemini vectors, so an outage uses skill overlap
         try:
-            req_embedding = embed_text(refined_text)
+            req_embedding = embed_query(refined_text, allow_local=False)
             print(f"Generated embedding with {len(req_embedding) if req_embedding else 0} dimensions")
         except Exception as e:
             print(f"Embedding generation failed: {e}")
             req_embedding = None
         
-        # Get all users except current user
-        users = db.query(models.User).filter(
+        # Score users with a vector through the user index
+        scores = {}
+        if req_embedding:
+            hits = user_index.search(req_embedding, k=10, min_score=0.1, exclude={current_user.id}, db=db)
+            scores.update(hits)
+            print(f"Scored users via {user_index.kind} index")
+        
+        # Fallback to skill overlap for users the embedding cannot score
+        req_skills = TextSkills(refined_text)
+        skill_rows = db.query(
+            models.User.id,
+            models.User.skills,
+            models.User.top_languages,
+            models.User.user_vector.isnot(None)
+        ).filter(
             models.User.id != current_user.id,
             models.User.is_active == True
-        ).all()
-        print(f"Found {len(users)} users to analyze")
+        ).yield_per(1000)
+        for user_id, skills, top_languages, has_vector in skill_rows:
+            if req_embedding and has_vector:
+                continue
+            user_skills = skill_ids(skills) | skill_ids(top_languages)
+            if req_skills and user_skills:
+                overlap = req_skills.overlap(user_skills)
+                score = overlap / (len(req_skills) + len(user_skills) - overlap)
+                if score > 0.1:  # Only include users with some relevance
+                    scores[user_id] = score
         
-        # Calculate similarity scores
-        recommendations = []
-        for user in users:
-            score = 0.0
-            
-            # Use embedding similarity if available
-            if req_embedding and user.user_vector:
-                try:
-                    score = cosine_similarity(req_embedding, user.user_vector)
-                except Exception as e:
-                    print(f"Cosine similarity failed for user {user.id}: {e}")
-                    score = 0.0
-            else:
-                # Fallback to skill overlap
-                req_skills = set(refined_text.lower().split())
-                user_skills = set((user.skills or []) + (user.top_languages or []))
-                user_skills_lower = {s.lower() for s in user_skills}
-                
-                if req_skills and user_skills_lower:
-                    overlap = len(req_skills.intersection(user_skills_lower))
-                    score = overlap / len(req_skills.union(user_skills_lower))
-            
-            if score > 0.1:  # Only include users with some relevance
-                recommendations.append(UserRecommendation(
-                    id=user.id,
-                    username=user.username,
-                    name=user.name,
-                    email=user.email,
-                    skills=user.skills or [],
-                    bio=user.bio or "",
-                    avatar_url=user.avatar_url or "",
-                    org_type=user.org_type or "",
-                    org_name=user.org_name or "",
-                    match_score=round(score, 3)
-                ))
+        top_ids = sorted(scores, key=lambda user_id: scores[user_id], reverse=True)[:10]
+        users = db.query(models.User).filter(models.User.id.in_(top_ids)).all()
+        users_by_id = {user.id: user for user in users}
         
-        # Sort by match score descending
-        recommendations.sort(key=lambda x: x.match_score, reverse=True)
+        recommendations = []
+        for user_id in top_ids:
+            user = users_by_id.get(user_id)
+            if user is None:
+                continue
+            recommendations.append(UserRecommendation(
+                id=user.id,
+                username=user.username,
+                name=user.name,
+                email=user.email,
+                skills=user.skills or [],
+                bio=user.bio or "",
+                avatar_url=user.avatar_url or "",
+                org_type=user.org_type or "",
+                org_name=user.org_name or "",
+                match_score=round(scores[user_id], 3)
+            ))
         
         print(f"Returning {len(recommendations)} recommendations")
-        return recommendations[:10]  # Return top 10 matches
+        return recommendations
         
     except Exception as e:
         print(f"Requirements analysis failed: {e}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
-
-def cosine_similarity(a, b):
-    """Calculate cosine similarity between two vectors"""
-    try:
-        if not a or not b or len(a) != len(b):
-            return 0.0
-        
-        dot_product = sum(x * y for x, y in zip(a, b))
-        magnitude_a = math.sqrt(sum(x * x for x in a))
-        magnitude_b = math.sqrt(sum(x * x for x in b))
-        
-        if magnitude_a == 0 or magnitude_b == 0:
-            return 0.0
-        
-        return dot_product / (magnitude_a * magnitude_b)
-    except Exception:
-        return 0.0
@@ -1,17 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List, Optional
-from .. import models, auth
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from .. import generations, models, auth
 from ..database import get_db
-from ..gemini_agent import embed_text
-import math
+from ..candidate_store import candidate_store, current_store
+from ..embeddings import TTLCache, embed_query, refresh_embeddings
+from ..lexical_index import candidate_lexical_index, ensure_lexical_index, reciprocal_rank_fusion
+from ..skills import SYNONYMS, TEXT_ALIASES, canonical_skills
+from ..vector_index import candidate_index
 
 router = APIRouter(prefix="/talent", tags=["Talent Sourcing"])
 
 
 class TalentSearchRequest(BaseModel):
     query: str
+    # Structured filters, applied in SQL before any vector scoring
+    min_experience: Optional[int] = None
+    max_experience: Optional[int] = None
+    location: Optional[str] = None
+    skills: List[str] = []  # candidate must have all of these
+    certifications: List[str] = []  # candidate must have all of these
+    # Pull experience, location, skill and certification constraints out of
+    # the query text into filters for the fields left unset above
+    parse_query: bool = True
+    # "hybrid" fuses BM25 and vector rankings; "lexical" never calls the
+    # embedding API; hybrid degrades to lexical when Gemini is unavailable
+    mode: Literal["hybrid", "vector", "lexical"] = "hybrid"
+    # Page size, and the X-Next-Cursor header of the previous page
+    limit: int = Field(20, ge=1, le=100)
+    cursor: Optional[str] = None
+
+
+class ParsedQuery(BaseModel):
+    text: str  # query with the constraint phrases removed, used for embedding
+    min_experience: Optional[int] = None
+    max_experience: Optional[int] = None
+    location: Optional[str] = None
+    skills: List[str] = []
+    any_certifications: List[str] = []  # candidate must have at least one
 
 
 class CandidateResponse(BaseModel):
@@ -29,70 +63,483 @@ class CandidateResponse(BaseModel):
     certifications: List[str]
     education: List[dict]
     summary: str
-    match_score: float
+    match_score: float  # cosine (vector), fused rank score (hybrid) or BM25 relative to the best hit (lexical)
 
     class Config:
         from_attributes = True
 
 
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class SearchFacets(BaseModel):
+    total: int  # ranked results the counts cover
+    skills: List[FacetCount]
+    locations: List[FacetCount]
+    experience: List[FacetCount]  # buckets: 0-2, 3-5, 6-9, 10+ years
+
+# Query parsing: rules for experience, dictionaries for everything else.
+# The dictionaries are the skills, certifications and cities actually stored
+# on candidates, so extracted filters always use the stored (canonical)
+# spelling.
+
+VOCABULARY_TTL_SECONDS = 300
+
+# Taxonomy synonyms recognized in query text
+SKILL_ALIASES = {alias: SYNONYMS[alias] for alias in TEXT_ALIASES}
+
+_YEARS = r"(?:\+\s*)?(?:years?|yrs?)(?:\s+of)?(?:\s+experience|\s+exp)?"
+EXPERIENCE_RULES = [
+    # (pattern, match -> (min years, max years)); the first rule that matches wins
+    (re.compile(rf"\b(\d{{1,2}})\s*(?:-|to)\s*(\d{{1,2}})\s*{_YEARS}", re.I), lambda m: (int(m[1]), int(m[2]))),
+    (re.compile(rf"\b(?:at least|minimum(?: of)?|min\.?)\s*(\d{{1,2}})\s*{_YEARS}", re.I), lambda m: (int(m[1]), None)),
+    (re.compile(rf"\b(?:more than|over)\s*(\d{{1,2}})\s*{_YEARS}", re.I), lambda m: (int(m[1]) + 1, None)),
+    (re.compile(rf"\b(?:up to|at most|maximum(?: of)?|max\.?)\s*(\d{{1,2}})\s*{_YEARS}", re.I), lambda m: (None, int(m[1]))),
+    (re.compile(rf"\b(?:less than|under|fewer than)\s*(\d{{1,2}})\s*{_YEARS}", re.I), lambda m: (None, int(m[1]) - 1)),
+    (re.compile(rf"\b(\d{{1,2}})\s*\+?\s*{_YEARS}", re.I), lambda m: (int(m[1]), None)),
+]
+# Words that never name a certification: connectors, and role words that
+# appear in certification names ("Data Engineer") but not as what a query
+# asks for ("engineer certified in AWS")
+CERTIFICATION_STOPWORDS = (
+    r"(?:a|an|and|with|in|of|on|for|engineers?|developers?|architects?|administrators?|programmers?"
+    r"|scientists?|analysts?|consultants?|specialists?|experts?|senior|junior|lead)"
+)
+_CERTIFICATION_WORD = rf"(?!{CERTIFICATION_STOPWORDS}\b)[\w+#.-]+"
+_CERTIFIED = r"(?:cert|certs|certified|certificate|certification|certifications)"
+# (pattern, index of the keyword word next to the certification word)
+CERTIFICATION_RULES = [
+    # "certified in AWS", "certification in Kubernetes"
+    (re.compile(rf"\b{_CERTIFIED}\s+(?:in|on|for)\s+({_CERTIFICATION_WORD}(?:\s+{_CERTIFICATION_WORD})?)", re.I), 0),
+    # "AWS certified", "with a Kubernetes certification"
+    (re.compile(rf"(?:\bwith\s+(?:an?\s+)?)?\b((?:{_CERTIFICATION_WORD}\s+)?{_CERTIFICATION_WORD})\s+{_CERTIFIED}\b", re.I), -1),
+]
+LOCATION_PREFIX = r"(?:\b(?:in|based in|located in|near|from)\s+)?"
+# Connectors left dangling at either end once constraint phrases are cut out
+DANGLING_WORDS = re.compile(r"^(?:(?:with|and|in|of|who|has|having|a|an)\b\W*)+|(?:\W*\b(?:with|and|in|of|who|has|having|a|an))+$", re.I)
+# Parsed filters are dropped in this order until some candidate passes
+RELAXATION_ORDER = [("skills",), ("any_certifications",), ("location",), ("min_experience", "max_experience")]
+
+
+def _phrase_pattern(phrases) -> Optional[re.Pattern]:
+    """One alternation over phrases, longest first, matched as whole terms."""
+    phrases = sorted(set(phrases), key=len, reverse=True)
+    if not phrases:
+        return None
+    body = "|".join(re.escape(phrase) for phrase in phrases)
+    return re.compile(rf"(?<![\w+#.])({body})(?![\w+#])", re.I)
+
+
+class TalentVocabulary:
+    """
+    Skills, certifications and cities of active candidates. A full reload
+    from the database runs every ttl seconds, by one caller while the others
+    keep using the current copy. In between, values that first appear in
+    the candidate store's dictionaries are added as they arrive, so a
+    candidate write costs nothing here unless it brings a new value.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at = 0.0
+        self._loading = False
+        self._stored_skills: dict = {}  # lowercase -> stored spelling, before aliases
+        self._store_seen = (0, 0, 0)  # store skill, certification and location dictionary sizes absorbed
+        self.skills: dict = {}  # lowercase -> stored spelling
+        self.short_skills: dict = {}  # 1-2 letter skills, matched case-sensitively
+        self.certifications: List[str] = []
+        self.certification_words: dict = {}  # certification -> its lowercase words
+        self.cities: dict = {}
+        self.skill_pattern = self.short_skill_pattern = self.city_pattern = None
+
+    def get(self, db: Session) -> "TalentVocabulary":
+        with self._lock:
+            if not self._loaded_at:
+                self._install(*self._collect(db))
+                return self
+            reload = not self._loading and time.monotonic() - self._loaded_at >= self.ttl
+            self._loading = self._loading or reload
+            if not reload:
+                self._absorb_store()
+        if reload:
+            try:
+                collected = self._collect(db)
+                with self._lock:
+                    self._install(*collected)
+            finally:
+                self._loading = False
+        return self
+
+    @staticmethod
+    def _collect(db: Session):
+        store_seen = tuple(len(d) for d in (candidate_store.skills, candidate_store.certifications, candidate_store.locations))
+        skills, certifications, cities = {}, set(), {}
+        rows = db.query(
+            models.Candidate.skills, models.Candidate.certifications, models.Candidate.location
+        ).filter(models.Candidate.is_active == True).yield_per(1000)
+        for candidate_skills, candidate_certifications, location in rows:
+            for skill in candidate_skills or []:
+                skills.setdefault(skill.lower(), skill)
+            certifications.update(candidate_certifications or [])
+            city = (location or "").split(",")[0].strip()
+            if city:
+                cities.setdefault(city.lower(), city)
+        return skills, certifications, cities, store_seen
+
+    def _install(self, skills: dict, certifications: set, cities: dict, store_seen: tuple) -> None:
+        self._stored_skills = skills
+        self.certifications = sorted(certifications)
+        self.cities = cities
+        self._store_seen = store_seen
+        self._compile()
+        self._loaded_at = time.monotonic()
+        self._absorb_store()
+
+    def _absorb_store(self) -> None:
+        """Add values the candidate store has seen since the last look."""
+        if not candidate_store.ready:
+            return
+        dictionaries = (candidate_store.skills, candidate_store.certifications, candidate_store.locations)
+        if tuple(len(d) for d in dictionaries) == self._store_seen:
+            return
+        new_skills, new_certifications, new_locations = (
+            d.values[seen:len(d)] for d, seen in zip(dictionaries, self._store_seen)
+        )
+        self._store_seen = tuple(len(d) for d in dictionaries)
+        changed = False
+        for skill in new_skills:
+            if skill.lower() not in self._stored_skills:
+                self._stored_skills[skill.lower()] = skill
+                changed = True
+        if set(new_certifications) - set(self.certifications):
+            self.certifications = sorted(set(self.certifications) | set(new_certifications))
+            changed = True
+        for location in new_locations:
+            city = location.split(",")[0].strip()
+            if city and city.lower() not in self.cities:
+                self.cities[city.lower()] = city
+                changed = True
+        if changed:
+            self._compile()
+
+    def _compile(self) -> None:
+        skills = dict(self._stored_skills)
+        for alias, skill in SKILL_ALIASES.items():
+            if skill.lower() in skills and alias not in skills:
+                skills[alias] = skills[skill.lower()]
+        self.short_skills = {name: skill for name, skill in skills.items() if len(name) <= 2 and name not in SKILL_ALIASES}
+        self.skills = {name: skill for name, skill in skills.items() if name not in self.short_skills}
+        self.skill_pattern = _phrase_pattern(self.skills)
+        short = {skill for skill in self.short_skills.values()}
+        self.short_skill_pattern = (
+            re.compile(rf"(?<![\w+#.])({'|'.join(re.escape(s) for s in short)})(?![\w+#])") if short else None
+        )
+        self.city_pattern = _phrase_pattern(self.cities)
+        self.certification_words = {
+            cert: frozenset(re.findall(r"[\w+#.-]+", cert.lower())) for cert in self.certifications
+        }
+
+
+vocabulary = TalentVocabulary(VOCABULARY_TTL_SECONDS)
+
+
+def parse_talent_query(query: str, vocab: TalentVocabulary) -> ParsedQuery:
+    """
+    Extract hard constraints from a recruiter query without an LLM call:
+    experience ranges by rules, then certifications, cities and skills by
+    dictionary lookup. Experience, location and certification phrases are
+    removed from the text that gets embedded; skills stay in it since they
+    carry meaning for the vector match.
+    """
+    parsed = ParsedQuery(text=query)
+    text = query
+
+    for pattern, bounds in EXPERIENCE_RULES:
+        match = pattern.search(text)
+        if match:
+            parsed.min_experience, parsed.max_experience = bounds(match)
+            text = text[: match.start()] + " " + text[match.end() :]
+            break
+
+    for pattern, nearest in CERTIFICATION_RULES:
+        match = pattern.search(text)
+        if not match:
+            continue
+        # Every keyword must be a whole word of the name, else just the one
+        # next to "certified"
+        words = match.group(1).lower().split()
+        found = [cert for cert, names in vocab.certification_words.items() if names.issuperset(words)]
+        if not found and len(words) > 1:
+            found = [cert for cert, names in vocab.certification_words.items() if words[nearest] in names]
+        if found:
+            parsed.any_certifications = found
+            text = text[: match.start()] + " " + text[match.end() :]
+            break
+
+    if vocab.city_pattern is not None:
+        match = re.search(LOCATION_PREFIX + vocab.city_pattern.pattern, text, re.I)
+        if match:
+            parsed.location = vocab.cities[match.group(1).lower()]
+            text = text[: match.start()] + " " + text[match.end() :]
+
+    skills = []
+    if vocab.skill_pattern is not None:
+        skills += [vocab.skills[m.lower()] for m in vocab.skill_pattern.findall(text)]
+    if vocab.short_skill_pattern is not None:
+        skills += vocab.short_skill_pattern.findall(text)
+    parsed.skills = list(dict.fromkeys(skills))
+
+    text = re.sub(r"\s+", " ", text).strip(" ,.;-")
+    text = DANGLING_WORDS.sub("", text).strip(" ,.;-")
+    parsed.text = text or query
+    return parsed
+
+
+def filtered_candidate_ids(
+    db: Session, request: TalentSearchRequest, parsed: Optional[ParsedQuery] = None
+) -> Optional[List[int]]:
+    """
+    Ids of active candidates passing the request's structured filters, plus
+    any filters parsed from the query for fields the request left unset, or
+    None when no filter is set. Evaluated as column masks over the in-memory
+    candidate store while it is current; before it is built, or while it
+    reloads after writes from another process, in SQL, where experience
+    uses idx_experience_active and skills and certifications use JSON
+    containment (GIN-indexed on PostgreSQL).
+    """
+    parsed = parsed or ParsedQuery(text=request.query)
+    min_experience = request.min_experience if request.min_experience is not None else parsed.min_experience
+    max_experience = request.max_experience if request.max_experience is not None else parsed.max_experience
+    location = request.location or parsed.location
+    skills = canonical_skills(request.skills) or parsed.skills
+    if min_experience is None and max_experience is None and not (
+        location or skills or request.certifications or parsed.any_certifications
+    ):
+        return None
+    store = current_store(db)
+    if store is not None:
+        return store.filter(
+            min_experience=min_experience,
+            max_experience=max_experience,
+            location=location,
+            skills=skills,
+            certifications=request.certifications,
+            any_certifications=[] if request.certifications else parsed.any_certifications,
+        )
+    conditions = []
+    if min_experience is not None:
+        conditions.append(models.Candidate.experience_years >= min_experience)
+    if max_experience is not None:
+        conditions.append(models.Candidate.experience_years <= max_experience)
+    if location:
+        conditions.append(models.Candidate.location.ilike(f"%{location.strip()}%"))
+    if skills:
+        conditions.append(models.json_contains_all(models.Candidate.skills, skills))
+    if request.certifications:
+        conditions.append(models.json_contains_all(models.Candidate.certifications, request.certifications))
+    elif parsed.any_certifications:
+        conditions.append(models.json_contains_any(models.Candidate.certifications, parsed.any_certifications))
+    rows = db.query(models.Candidate.id).filter(models.Candidate.is_active == True, *conditions)
+    return [candidate_id for candidate_id, in rows]
+
+
+# Ranked (id, score) lists of up to TALENT_SEARCH_MAX_RESULTS candidates
+# are cached per normalized search and shared candidate generation:
+# repeated and shared searches skip ranking, later pages slice the same
+# list, and a candidate write by any worker or instance makes older
+# entries unreachable.
+TALENT_SEARCH_MAX_RESULTS = int(os.getenv("TALENT_SEARCH_MAX_RESULTS", "200"))
+ranked_cache = TTLCache(
+    int(os.getenv("TALENT_SEARCH_CACHE_SIZE", "256")),
+    float(os.getenv("TALENT_SEARCH_CACHE_TTL", "300")),
+)
+
+
+def search_fingerprint(request: TalentSearchRequest) -> str:
+    """
+    Hash of every request field that affects the ranking (not limit or
+    cursor), normalized so equivalent searches share it. Query case is kept:
+    the parser matches short skill names like "Go" case-sensitively.
+    """
+    fields = request.dict(exclude={"limit", "cursor"})
+    fields["query"] = " ".join(request.query.split())
+    fields["location"] = request.location.strip().casefold() if request.location else None
+    fields["skills"] = sorted(canonical_skills(request.skills))
+    fields["certifications"] = sorted(set(request.certifications))
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+def encode_cursor(fingerprint: str, score: float, candidate_id: int) -> str:
+    payload = json.dumps({"q": fingerprint, "s": score, "id": candidate_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, fingerprint: str) -> tuple[float, int]:
+    """Return the (score, id) a cursor resumes after; 400 if it is malformed or from another query."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        position = (float(payload["s"]), int(payload["id"]))
+        query = payload["q"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if query != fingerprint:
+        raise HTTPException(status_code=400, detail="Cursor belongs to a different search")
+    return position
+
+
+def rank_candidates(db: Session, request: TalentSearchRequest) -> tuple[list[tuple[int, float]], bool]:
+    """
+    Rank candidates for a search, best first with ties broken by id.
+    Structured filters narrow the pool in SQL first; BM25 and vector
+    similarity then rank only the surviving candidates. Also returns
+    whether the ranking is complete, i.e. not a lexical-only fallback
+    for an embedding outage nor read from a BM25 index still rebuilding,
+    and so worth caching.
+    """
+    # Pull hard constraints out of the query text before embedding
+    parsed = parse_talent_query(request.query, vocabulary.get(db)) if request.parse_query else None
+    if parsed is not None:
+        print(f"Parsed query filters: {parsed.dict(exclude={'text'})}")
+    
+    # Apply structured filters in SQL, then score only the survivors
+    allowed = filtered_candidate_ids(db, request, parsed)
+    relaxed = False
+    for fields in RELAXATION_ORDER:
+        # Parsed constraints are inferred, so relax them rather than return nothing
+        if parsed is None or allowed != []:
+            break
+        if any(getattr(parsed, field) not in (None, []) for field in fields):
+            print(f"No candidates match the parsed filters, dropping {', '.join(fields)}")
+            parsed = parsed.copy(update={field: [] if field in ("skills", "any_certifications") else None for field in fields})
+            allowed = filtered_candidate_ids(db, request, parsed)
+            relaxed = True
+    if allowed is not None:
+        print(f"{len(allowed)} candidates pass the filters")
+        if not allowed:
+            return [], True
+    
+    # Relaxed constraints go back into the searched text as soft signals
+    text = parsed.text if parsed is not None and not relaxed else request.query
+    
+    vector_hits = None
+    if request.mode != "lexical":
+        # Hybrid search never compares a locally embedded query with Gemini vectors
+        query_embedding = embed_query(text, allow_local=request.mode == "vector")
+        print(f"Generated query embedding with {len(query_embedding) if query_embedding else 0} dimensions")
+        if query_embedding:
+            # Score the (filtered) indexed candidates in one pass
+            vector_hits = candidate_index.search(
+                query_embedding, k=TALENT_SEARCH_MAX_RESULTS, min_score=0.1, db=db, allowed=allowed
+            )
+            print(f"Scored candidates via {candidate_index.kind} index")
+        elif request.mode == "vector":
+            raise HTTPException(status_code=500, detail="Failed to generate search embedding")
+        else:
+            print("Query embedding unavailable, falling back to lexical search")
+    
+    lexical_current = True
+    if vector_hits is not None and request.mode == "vector":
+        hits = vector_hits
+    else:
+        lexical_current = ensure_lexical_index(db)
+        lexical_hits = candidate_lexical_index.search(text, k=TALENT_SEARCH_MAX_RESULTS, allowed=allowed)
+        print(f"Scored {len(lexical_hits)} candidates via {candidate_lexical_index.kind} index")
+        if vector_hits is None:
+            # BM25 relative to the best hit
+            best = lexical_hits[0][1] if lexical_hits else 1.0
+            hits = [(candidate_id, score / best) for candidate_id, score in lexical_hits]
+        else:
+            hits = reciprocal_rank_fusion(vector_hits, lexical_hits)
+    # A total order, so a cursor's (score, id) pins an exact position
+    hits = sorted(((int(candidate_id), float(score)) for candidate_id, score in hits), key=lambda hit: (-hit[1], hit[0]))
+    complete = (request.mode == "lexical" or vector_hits is not None) and lexical_current
+    return hits[:TALENT_SEARCH_MAX_RESULTS], complete
+
+
+def ranked_results(db: Session, request: TalentSearchRequest, fingerprint: str) -> list[tuple[int, float]]:
+    """The ranked list for a search, from the cache while the candidate generation is unchanged."""
+    # Read the generation before ranking, so a write that lands meanwhile
+    # leaves this result under an already-outdated key
+    key = (fingerprint, generations.shared(db, models.Candidate.__tablename__))
+    ranked = ranked_cache.get(key)
+    if ranked is not None:
+        print(f"Serving ranked candidates from cache (generation {key[1]})")
+        return ranked
+    ranked, complete = rank_candidates(db, request)
+    if complete:
+        ranked_cache.put(key, ranked)
+    return ranked
+
+
 @router.post("/search", response_model=List[CandidateResponse])
-async def search_candidates(
+def search_candidates(
     request: TalentSearchRequest,
+    response: Response,
     current_user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Search for candidates using natural language query.
-    Uses vector similarity to find best matches.
+    Returns one page of up to ``limit`` candidates. When more remain, the
+    ``X-Next-Cursor`` header holds the cursor for the next page; pass it
+    back with the same query to continue.
     """
     try:
         print(f"Searching candidates for query: {request.query[:100]}...")
+        fingerprint = search_fingerprint(request)
+        position = decode_cursor(request.cursor, fingerprint) if request.cursor else None
+        ranked = ranked_results(db, request, fingerprint)
         
-        # Generate embedding for the search query
-        query_embedding = embed_text(request.query)
-        print(f"Generated query embedding with {len(query_embedding) if query_embedding else 0} dimensions")
+        start = 0
+        if position is not None:
+            # Seek past the cursor position rather than trusting an offset,
+            # so a re-ranked list after a write still continues in order
+            last_score, last_id = position
+            start = next(
+                (i for i, (candidate_id, score) in enumerate(ranked) if (-score, candidate_id) > (-last_score, last_id)),
+                len(ranked),
+            )
         
-        # Get all active candidates
+        hits = ranked[start : start + request.limit]
+        if start + request.limit < len(ranked):
+            last_id, last_score = hits[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor(fingerprint, last_score, last_id)
+        
+        # Hydrate only this page's rows from the database
         candidates = db.query(models.Candidate).filter(
+            models.Candidate.id.in_([candidate_id for candidate_id, _ in hits]),
             models.Candidate.is_active == True
         ).all()
-        print(f"Found {len(candidates)} active candidates")
-        
-        if not query_embedding:
-            raise HTTPException(status_code=500, detail="Failed to generate search embedding")
+        candidates_by_id = {candidate.id: candidate for candidate in candidates}
         
-        # Calculate similarity scores
         results = []
-        for candidate in candidates:
-            if candidate.candidate_vector:
-                try:
-                    score = cosine_similarity(query_embedding, candidate.candidate_vector)
-                    if score > 0.1:  # Only include relevant matches
-                        results.append(CandidateResponse(
-                            id=candidate.id,
-                            name=candidate.name,
-                            email=candidate.email,
-                            phone=candidate.phone,
-                            title=candidate.title,
-                            location=candidate.location,
-                            experience_years=candidate.experience_years,
-                            current_company=candidate.current_company,
-                            current_role=candidate.current_role,
-                            work_history=candidate.work_history or [],
-                            skills=candidate.skills or [],
-                            certifications=candidate.certifications or [],
-                            education=candidate.education or [],
-                            summary=candidate.summary or "",
-                            match_score=round(score, 3)
-                        ))
-                except Exception as e:
-                    print(f"Error calculating similarity for candidate {candidate.id}: {e}")
-        
-        # Sort by match score descending
-        results.sort(key=lambda x: x.match_score, reverse=True)
+        for candidate_id, score in hits:
+            candidate = candidates_by_id.get(candidate_id)
+            if candidate is None:
+                continue
+            results.append(CandidateResponse(
+                id=candidate.id,
+                name=candidate.name,
+                email=candidate.email,
+                phone=candidate.phone,
+                title=candidate.title,
+                location=candidate.location,
+                experience_years=candidate.experience_years,
+                current_company=candidate.current_company,
+                current_role=candidate.current_role,
+                work_history=candidate.work_history or [],
+                skills=candidate.skills or [],
+                certifications=candidate.certifications or [],
+                education=candidate.education or [],
+                summary=candidate.summary or "",
+                match_score=round(score, 3)
+            ))
         
         print(f"Returning {len(results)} matching candidates")
-        return results[:20]  # Return top 20 matches
+        return results
         
     except HTTPException:
         raise
@@ -103,8 +550,50 @@ async def search_candidates(
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
 
+@router.post("/facets", response_model=SearchFacets)
+def search_facets(
+    request: TalentSearchRequest,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Skill, location and experience-bucket counts over every ranked result
+    of a search, not just one page. Shares the ranked-result cache with
+    /talent/search, so asking for facets after a search does not re-rank.
+    """
+    try:
+        ranked = ranked_results(db, request, search_fingerprint(request))
+        return current_store(db, wait=True).facets([candidate_id for candidate_id, _ in ranked])
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Talent facets failed: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Facets failed: {str(e)}")
+
+
+@router.get("/search-cache")
+def search_cache_stats(
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Hit/miss counters of the ranked-result cache and the current candidate generation"""
+    return {**ranked_cache.stats(), "generation": generations.shared(db, models.Candidate.__tablename__)}
+
+
+@router.post("/parse-query", response_model=ParsedQuery)
+def parse_query(
+    request: TalentSearchRequest,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Show the filters /talent/search would extract from a query."""
+    return parse_talent_query(request.query, vocabulary.get(db))
+
+
 @router.post("/seed")
-async def seed_candidates(
+def seed_candidates(
     current_user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -391,12 +880,8 @@ async def seed_candidates(
         ]
         
         # Create candidates with embeddings
-        created_count = 0
+        candidates = []
         for candidate_data in dummy_candidates:
-            # Generate embedding from candidate summary and skills
-            embedding_text = f"{candidate_data['title']} {candidate_data['summary']} {' '.join(candidate_data['skills'])}"
-            candidate_vector = embed_text(embedding_text)
-            
             candidate = models.Candidate(
                 name=candidate_data["name"],
                 email=candidate_data["email"],
@@ -411,11 +896,14 @@ async def seed_candidates(
                 certifications=candidate_data.get("certifications", []),
                 education=candidate_data["education"],
                 summary=candidate_data["summary"],
-                candidate_vector=candidate_vector,
                 is_active=True
             )
-            db.add(candidate)
-            created_count += 1
+            candidates.append(candidate)
+        
+        # Embed every candidate's title, summary and skills in batched calls
+        refresh_embeddings(db, candidates)
+        db.add_all(candidates)
+        created_count = len(candidates)
         
         db.commit()
         print(f"Successfully seeded {created_count} candidates")
@@ -429,20 +917,3 @@ async def seed_candidates(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Seed failed: {str(e)}")
 
-
-def cosine_similarity(a, b):
-    """Calculate cosine similarity between two vectors"""
-    try:
-        if not a or not b or len(a) != len(b):
-            return 0.0
-        
-        dot_product = sum(x * y for x, y in zip(a, b))
-        magnitude_a = math.sqrt(sum(x * x for x in a))
-        magnitude_b = math.sqrt(sum(x * x for x in b))
-        
-        if magnitude_a == 0 or magnitude_b == 0:
-            return 0.0
-        
-        return dot_product / (magnitude_a * magnitude_b)
-    except Exception:
-        return 0.0
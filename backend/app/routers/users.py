@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from .. import schemas, crud, auth, models
 from ..database import get_db
-from ..gemini_agent import embed_text
+from ..embeddings import refresh_embedding
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -43,11 +43,10 @@ def update_user(
                 setattr(user, field, value)
                 print(f"Updated {field} to {value}")
         
-        # Recompute user embedding
+        # Recompute user embedding if the embedded fields changed
         try:
-            vec_text = f"{user.name} {user.bio} {' '.join(user.skills or [])} {' '.join(user.top_languages or [])}"
-            user.user_vector = embed_text(vec_text)
-            print("Updated user embedding")
+            if refresh_embedding(db, user):
+                print("Updated user embedding")
         except Exception as e:
             print(f"Failed to update user embedding: {e}")
             pass
@@ -116,8 +115,7 @@ def add_repository_to_user(
         
         # Recompute user embedding with all data
         try:
-            vec_text = f"{user.name} {user.bio} {' '.join(user.skills or [])} {' '.join(user.top_languages or [])} {' '.join(user.top_frameworks or [])}"
-            user.user_vector = embed_text(vec_text)
+            refresh_embedding(db, user)
         except Exception as e:
             print(f"Failed to update user embedding: {e}")
         
@@ -171,8 +169,7 @@ def remove_repository_from_user(
         
         # Recompute user embedding
         try:
-            vec_text = f"{user.name} {user.bio} {' '.join(user.skills or [])} {' '.join(user.top_languages or [])}"
-            user.user_vector = embed_text(vec_text)
+            refresh_embedding(db, user)
         except Exception as e:
             print(f"Failed to update user embedding: {e}")
         
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional, Literal
 from datetime import datetime
 
@@ -133,6 +133,17 @@ class SwipeResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class SwipeBatch(BaseModel):
+    # Swipes in the order they were made; later duplicates of a project are ignored
+    swipes: List[SwipeCreate] = Field(..., min_length=1, max_length=500)
+
+class SwipeResult(BaseModel):
+    project_id: int
+    is_like: bool
+    # created, already_swiped (earlier in this batch or before) or project_not_found
+    status: Literal["created", "already_swiped", "project_not_found"]
+    id: Optional[int] = None  # swipe id when created
+
 class Token(BaseModel):
     access_token: str
     token_type: str
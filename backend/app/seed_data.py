@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Session
 from .database import SessionLocal
 from . import models, auth
-from .gemini_agent import embed_text
+from .embeddings import refresh_embeddings
 
 
 def seed_database():
@@ -440,12 +440,8 @@ def seed_database():
         },
     ]
 
+    candidates = []
     for candidate_data in candidates_data:
-        # Generate embedding from candidate summary and skills
-        embedding_text = f"{candidate_data['title']} {candidate_data['summary']} {' '.join(candidate_data['skills'])}"
-        print(f"  → Generating embedding for {candidate_data['name']}...")
-        candidate_vector = embed_text(embedding_text)
-
         candidate = models.Candidate(
             name=candidate_data["name"],
             email=candidate_data["email"],
@@ -460,10 +456,14 @@ def seed_database():
             certifications=candidate_data.get("certifications", []),
             education=candidate_data["education"],
             summary=candidate_data["summary"],
-            candidate_vector=candidate_vector,
             is_active=True,
         )
-        db.add(candidate)
+        candidates.append(candidate)
+
+    # Generate embeddings from candidate title, summary and skills in batches
+    print(f"  → Generating embeddings for {len(candidates)} candidates...")
+    refresh_embeddings(db, candidates)
+    db.add_all(candidates)
 
     db.commit()
     db.close()
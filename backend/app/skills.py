@@ -0,0 +1,222 @@
+"""
+Canonical skill taxonomy.
+
+Skills, languages and frameworks arrive from GitHub analysis, Gemini
+extraction, seed data and user input, so the same skill shows up as
+"React", "react", "React.js" and "ReactJS". Exact string matching missed
+those pairs and every matcher lowercased again to compensate. Instead:
+
+- ``canonical_skills`` maps each value to its canonical spelling (synonyms
+  and case folded, whitespace collapsed, duplicates dropped). The models
+  apply it when User, Project and Candidate skill fields are written, and
+  the canonicalize_skill_names migration rewrites stored rows.
+- ``skill_id`` interns the case-folded canonical spelling to a small
+  integer, so matchers build sets of ints once per row and compare those.
+
+Terms outside the taxonomy are kept as written (whitespace collapsed) and
+still get an id, so "Hardhat" and "hardhat" match even without an entry.
+Ids are per process and never stored. Only stored values are interned;
+free text is read with ``TextSkills``, which keeps its words to itself.
+"""
+import re
+import threading
+
+# Canonical spelling -> synonyms. Spellings that only differ in case or
+# whitespace need no entry.
+SKILL_TAXONOMY = {
+    # Languages
+    "JavaScript": ("js", "ecmascript", "es6", "vanilla js"),
+    "TypeScript": ("ts",),
+    "Python": ("python3", "py"),
+    "Go": ("golang",),
+    "C++": ("cpp", "c plus plus"),
+    "C#": ("csharp", "c sharp"),
+    "Java": (),
+    "Kotlin": (),
+    "Swift": (),
+    "Dart": (),
+    "Rust": (),
+    "Ruby": (),
+    "PHP": (),
+    "Solidity": (),
+    "SQL": (),
+    "HTML": ("html5",),
+    "CSS": ("css3",),
+    "Bash": ("shell", "shell scripting", "bash scripting"),
+    # Frameworks and libraries
+    "React": ("react.js", "reactjs", "react js"),
+    "React Native": ("react-native", "reactnative"),
+    "Vue.js": ("vue", "vuejs", "vue js"),
+    "Angular": ("angularjs", "angular.js"),
+    "Next.js": ("next", "nextjs"),
+    "Nuxt.js": ("nuxt", "nuxtjs"),
+    "Node.js": ("node", "nodejs", "node js"),
+    "Express.js": ("express", "expressjs"),
+    "Redux": ("redux.js",),
+    "Tailwind CSS": ("tailwind", "tailwindcss"),
+    "Django": (),
+    "Flask": (),
+    "FastAPI": ("fast api",),
+    "Spring Boot": ("springboot", "spring-boot"),
+    "Ruby on Rails": ("rails", "ror"),
+    "Flutter": (),
+    "SwiftUI": (),
+    "Socket.io": ("socketio", "socket io"),
+    "Web3.js": ("web3js",),
+    "Chart.js": ("chartjs",),
+    "TensorFlow": ("tf", "tensorflow2"),
+    "PyTorch": ("torch",),
+    "scikit-learn": ("sklearn", "scikit learn", "scikitlearn"),
+    "Pandas": (),
+    "NumPy": (),
+    "Apache Spark": ("spark", "pyspark"),
+    # Data stores and infrastructure
+    "PostgreSQL": ("postgres", "postgre", "psql"),
+    "MySQL": (),
+    "MongoDB": ("mongo",),
+    "Redis": (),
+    "Kafka": ("apache kafka",),
+    "Docker": (),
+    "Kubernetes": ("k8s",),
+    "Terraform": (),
+    "AWS": ("amazon web services",),
+    "GCP": ("google cloud", "google cloud platform"),
+    "Azure": ("microsoft azure",),
+    "GraphQL": (),
+    "REST APIs": ("rest", "rest api", "restful", "restful apis"),
+    "GitLab CI": ("gitlab ci/cd", "gitlab-ci"),
+    "CI/CD": ("cicd", "ci cd", "continuous integration"),
+    # Disciplines
+    "Machine Learning": ("ml",),
+    "Artificial Intelligence": ("ai",),
+    "Deep Learning": ("dl",),
+    "NLP": ("natural language processing",),
+    "Computer Vision": ("cv",),
+    "UI/UX": ("ui ux", "ux/ui", "ui/ux design"),
+}
+
+# Synonyms recognized in free text (search queries, requirement pitches).
+# Ones that are also everyday words ("go", "next", "rest", "express",
+# "node", "spark", "shell", "cv", "py") only count in skill lists.
+TEXT_ALIASES = (
+    "ml", "ai", "js", "ts", "tf", "k8s", "golang", "postgres", "nodejs",
+    "reactjs", "react.js", "vuejs", "nextjs", "expressjs", "sklearn", "cpp", "csharp",
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def skill_key(term: str) -> str:
+    """Case-folded term with whitespace collapsed."""
+    return _WHITESPACE.sub(" ", str(term)).strip().casefold()
+
+
+SYNONYMS = {
+    skill_key(name): canonical
+    for canonical, synonyms in SKILL_TAXONOMY.items()
+    for name in (canonical, *synonyms)
+}
+
+
+def canonical_skill(term: str) -> str:
+    """Canonical spelling of term; unknown terms keep theirs."""
+    spelled = _WHITESPACE.sub(" ", str(term)).strip()
+    return SYNONYMS.get(spelled.casefold(), spelled)
+
+
+def canonical_skills(values):
+    """Canonical spellings of values in order, without blanks or duplicates. None stays None."""
+    if values is None:
+        return None
+    result, seen = [], set()
+    for value in values:
+        if value is None:
+            continue
+        skill = canonical_skill(value)
+        key = skill.casefold()
+        if skill and key not in seen:
+            seen.add(key)
+            result.append(skill)
+    return result
+
+
+_lock = threading.Lock()
+_ids: dict[str, int] = {skill_key(canonical): i for i, canonical in enumerate(SKILL_TAXONOMY)}
+_keys: list[str] = list(_ids)  # id -> canonical key
+# Exact spelling -> id, so repeated spellings skip normalization
+_spellings: dict[str, int] = {}
+
+
+def skill_id(term: str) -> int:
+    """Small integer id of a term's canonical skill, interned on first use."""
+    found = _spellings.get(term)
+    if found is None:
+        key = skill_key(term)
+        key = SYNONYMS[key].casefold() if key in SYNONYMS else key
+        with _lock:
+            found = _ids.get(key)
+            if found is None:
+                found = _ids[key] = len(_keys)
+                _keys.append(key)
+            _spellings[term] = found
+    return found
+
+
+def skill_ids(values) -> set[int]:
+    """Ids of the skills in values (None or empty gives an empty set)."""
+    ids = set()
+    for value in values or ():
+        found = _spellings.get(value)
+        if found is None:
+            if value is None or not str(value).strip():
+                continue
+            found = skill_id(value)
+        ids.add(found)
+    return ids
+
+
+_TEXT_TOKEN = re.compile(r"[\w+#./-]+")
+# Canonical key -> spelling of names of two characters or fewer ("Go", "R"),
+# which free text must spell exactly
+_SHORT_NAMES = {skill_key(name): name for name in SKILL_TAXONOMY if len(name) <= 2}
+_TEXT_PHRASES = {
+    key: SYNONYMS[key].casefold()
+    for key in [skill_key(name) for name in SKILL_TAXONOMY if len(name) > 2] + list(TEXT_ALIASES)
+}
+
+
+class TextSkills:
+    """
+    Skills named in free text as canonical keys, for overlap with id sets.
+    Taxonomy names and TEXT_ALIASES are matched as phrases of up to
+    max_words words, longest first. Any other word is kept as a plain key
+    so it can still match a stored skill outside the taxonomy, but nothing
+    is interned: arbitrary text never grows the process-wide maps.
+    """
+
+    def __init__(self, text: str, max_words: int = 3):
+        words = [word.strip(".,;:/-") for word in _TEXT_TOKEN.findall(text or "")]
+        words = [word for word in words if word]
+        keys, i = set(), 0
+        while i < len(words):
+            for size in range(min(max_words, len(words) - i), 0, -1):
+                phrase = skill_key(" ".join(words[i : i + size]))
+                if phrase in _TEXT_PHRASES:
+                    keys.add(_TEXT_PHRASES[phrase])
+                elif size > 1:
+                    continue
+                elif phrase in _SHORT_NAMES:
+                    if words[i] == _SHORT_NAMES[phrase]:
+                        keys.add(phrase)
+                elif phrase not in SYNONYMS:
+                    keys.add(phrase)  # everyday synonyms like "next" are dropped
+                i += size
+                break
+        self.keys = frozenset(keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def overlap(self, ids) -> int:
+        """How many of the skill ids are named in the text."""
+        return sum(1 for skill in ids if _keys[skill] in self.keys)
@@ -0,0 +1,175 @@
+"""
+Shared vector similarity engine.
+
+Every similarity computation in the backend goes through these kernels so
+there is one policy for dtype, normalization, dimension mismatches and score
+range:
+
+- vectors are handled as float32;
+- a vector that is empty, has the wrong dimension, a zero norm or
+  non-finite values is "unusable" and scores 0.0 against everything;
+- cosine scores are clipped to [0, 1] unless ``clip=False`` is passed.
+
+Embedding dimensionality is a setting (``EMBEDDING_DIMENSIONS``, default
+768). It is requested from the embedding model and every vector written to
+the database is checked against it.
+"""
+import os
+import numpy as np
+
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "768"))
+
+
+def as_vector(vector, dimensions: int | None = None) -> np.ndarray | None:
+    """Convert vector to a 1-D float32 array, or None if it is unusable."""
+    if vector is None:
+        return None
+    arr = np.asarray(vector, dtype=np.float32).reshape(-1)
+    if arr.shape[0] == 0:
+        return None
+    if dimensions is not None and arr.shape[0] != dimensions:
+        return None
+    if not np.isfinite(arr).all():
+        return None
+    return arr
+
+
+def validate_vector(vector, dimensions: int | None = None):
+    """
+    Check a vector before it is stored. Empty vectors are stored as None;
+    any other vector must have exactly the configured dimensionality.
+    """
+    dimensions = dimensions or EMBEDDING_DIMENSIONS
+    if vector is None or len(vector) == 0:
+        return None
+    if len(vector) != dimensions:
+        raise ValueError(f"Expected a {dimensions}-dim vector, got {len(vector)} dimensions")
+    return vector
+
+
+def truncate(x: np.ndarray, dimensions: int) -> np.ndarray:
+    """
+    Matryoshka truncation: keep the first dimensions components of a vector
+    or of each matrix row and renormalize. Only meaningful for embeddings
+    trained with a nested (MRL) objective, such as gemini-embedding-001.
+    """
+    return normalize(np.asarray(x, dtype=np.float32)[..., :dimensions])
+
+
+def normalize(x: np.ndarray) -> np.ndarray:
+    """L2-normalize a vector or each row of a matrix. Zero rows stay zero."""
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return np.divide(x, norms, out=np.zeros_like(x), where=norms > 0)
+
+
+def as_matrix(vectors, dimensions: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Stack vectors into a normalized (n, dimensions) float32 matrix.
+    Returns (matrix, valid) where valid[i] is False for unusable inputs,
+    whose rows are left as zeros.
+    """
+    vectors = list(vectors)
+    matrix = np.zeros((len(vectors), dimensions), dtype=np.float32)
+    valid = np.zeros(len(vectors), dtype=bool)
+    for i, vector in enumerate(vectors):
+        arr = as_vector(vector, dimensions)
+        if arr is not None:
+            matrix[i] = arr
+            valid[i] = True
+    matrix = normalize(matrix)
+    valid &= np.any(matrix != 0, axis=1)
+    return matrix, valid
+
+
+def _finish(scores: np.ndarray, clip: bool) -> np.ndarray:
+    return np.clip(scores, 0.0, 1.0) if clip else scores
+
+
+def cosine_one_to_many(query, matrix, normalized: bool = False, clip: bool = True) -> np.ndarray:
+    """
+    Score one query against every row of matrix.
+    Pass normalized=True when matrix rows are already unit length.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[0] == 0:
+        return np.zeros(0, dtype=np.float32)
+    q = as_vector(query, matrix.shape[1])
+    if q is None:
+        return np.zeros(matrix.shape[0], dtype=np.float32)
+    if not normalized:
+        matrix = normalize(matrix)
+    return _finish(matrix @ normalize(q), clip)
+
+
+def cosine_many_to_many(queries, matrix, normalized: bool = False, clip: bool = True) -> np.ndarray:
+    """Score every row of queries against every row of matrix -> (nq, n)."""
+    queries = np.asarray(queries, dtype=np.float32)
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if queries.ndim != 2 or matrix.ndim != 2 or queries.shape[1] != matrix.shape[1]:
+        return np.zeros((len(queries), len(matrix)), dtype=np.float32)
+    if not normalized:
+        queries = normalize(queries)
+        matrix = normalize(matrix)
+    return _finish(queries @ matrix.T, clip)
+
+
+def cosine_similarity(a, b) -> float:
+    """Cosine similarity of two vectors in [0, 1]; 0.0 if either is unusable."""
+    va, vb = as_vector(a), as_vector(b)
+    if va is None or vb is None or va.shape != vb.shape:
+        return 0.0
+    return float(cosine_one_to_many(va, vb.reshape(1, -1))[0])
+
+
+def top_k(scores: np.ndarray, k: int, min_score: float | None = None) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first. Ties keep index order.
+    With min_score, only indices scoring strictly above it are returned.
+    """
+    scores = np.asarray(scores)
+    if k <= 0 or scores.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    if min_score is not None:
+        candidates = np.flatnonzero(scores > min_score)
+    else:
+        candidates = np.arange(scores.shape[0])
+    if k < candidates.shape[0]:
+        part = np.argpartition(-scores[candidates], k - 1)[:k]
+        candidates = np.sort(candidates[part])
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order]
+
+
+def quantize_int8(matrix) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-row int8 quantization: row ~= codes * scale.
+    Returns (codes int8 (n, d), scales float32 (n,)).
+    """
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+    scales = (np.abs(matrix).max(axis=1) / 127.0).astype(np.float32)
+    safe = np.where(scales > 0, scales, 1.0)[:, None]
+    codes = np.clip(np.rint(matrix / safe), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def int8_one_to_many(query, codes, scales, chunk: int = 256, clip: bool = True) -> np.ndarray:
+    """
+    Approximate cosine of a query against int8-quantized unit rows. Rows
+    are dequantized in small chunks that stay cache-resident, so the scan
+    reads a quarter of the float32 bytes and never materializes the pool
+    as float32.
+    """
+    codes = np.asarray(codes)
+    if codes.ndim != 2 or codes.shape[0] == 0:
+        return np.zeros(0, dtype=np.float32)
+    q = as_vector(query, codes.shape[1])
+    if q is None:
+        return np.zeros(codes.shape[0], dtype=np.float32)
+    q = normalize(q)
+    out = np.empty(codes.shape[0], dtype=np.float32)
+    for start in range(0, codes.shape[0], chunk):
+        block = codes[start : start + chunk].astype(np.float32)
+        out[start : start + chunk] = block @ q
+    out *= scales
+    return _finish(out, clip)
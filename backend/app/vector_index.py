@@ -0,0 +1,787 @@
+"""
+Process-resident vector indexes.
+
+Each index keeps a contiguous, L2-normalized float32 matrix plus a parallel
+array of row ids, so a query is scored against every row with a single
+matrix-vector product and the top-k is picked with ``argpartition``. Indexes
+are built once at startup and kept in sync with the database by session
+hooks that apply inserts, updates and deactivations after each commit.
+
+The index type is chosen per entity with the ``VECTOR_INDEX_CANDIDATES`` /
+``VECTOR_INDEX_USERS`` / ``VECTOR_INDEX_PROJECTS`` environment variables:
+
+- ``exact`` (default on SQLite): brute-force scan, recall 1.0.
+- ``ivf``: inverted-file index. Rows are bucketed by their nearest k-means
+  centroid and a query only scans the ``IVF_NPROBE`` closest of
+  ``IVF_NLIST`` buckets. Raising nprobe trades latency for recall.
+- ``int8``: exact scan over int8 scalar-quantized rows (~4x less memory),
+  re-ranking the top ``INT8_RERANK`` with the float vectors from the DB.
+- ``matryoshka``: two-stage scan. Every row is scored on its truncated,
+  renormalized ``MATRYOSHKA_DIMENSIONS``-dim prefix and the best
+  ``MATRYOSHKA_RERANK`` are re-scored with the full vector.
+- ``pgvector`` (default on PostgreSQL): the query runs in SQL as
+  ``ORDER BY vector <=> :q LIMIT k`` against the HNSW indexes, so only k
+  rows leave the database and nothing is held in process memory.
+
+When ``VECTOR_STORE_DIR`` is set, exact indexes are backed by a
+memory-mapped store in that directory (see ``vector_store.py``) so several
+uvicorn workers share one copy of the vectors and see each other's writes.
+"""
+import os
+import threading
+import time
+import numpy as np
+from sqlalchemy import Integer, any_, bindparam, event, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+from . import generations, models
+from .database import SessionLocal, is_postgres
+from .vector import (
+    EMBEDDING_DIMENSIONS,
+    as_matrix,
+    as_vector,
+    normalize,
+    cosine_one_to_many,
+    int8_one_to_many,
+    quantize_int8,
+    top_k,
+    truncate,
+)
+from .vector_store import VectorStore
+
+# Store generations published after this are from the current deployment
+_STARTED = time.time()
+# Index builds stream rows from the database and stack them in blocks this big
+BUILD_CHUNK_ROWS = 4096
+
+
+class VectorIndex:
+    """Exact cosine-similarity index over (id, vector) pairs."""
+
+    kind = "exact"
+    storage_dtype = np.float32
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS, initial_capacity: int = 1024):
+        self.dimensions = dimensions
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((initial_capacity, dimensions), dtype=self.storage_dtype)
+        self._ids = np.zeros(initial_capacity, dtype=np.int64)
+        self._rows: dict[int, int] = {}  # id -> row in _matrix
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._rows
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the live rows (vectors + ids)."""
+        return self._size * (self.dimensions * self._matrix.itemsize + self._ids.itemsize)
+
+    def _normalize(self, vector) -> np.ndarray | None:
+        """Return a unit-length float32 copy of vector, or None if unusable."""
+        arr = as_vector(vector, self.dimensions)
+        if arr is None or not arr.any():
+            return None
+        return normalize(arr)
+
+    def _reserve(self, capacity: int) -> None:
+        if capacity <= self._matrix.shape[0]:
+            return
+        new_capacity = max(capacity, self._matrix.shape[0] * 2)
+        matrix = np.zeros((new_capacity, self.dimensions), dtype=self.storage_dtype)
+        ids = np.zeros(new_capacity, dtype=np.int64)
+        matrix[: self._size] = self._matrix[: self._size]
+        ids[: self._size] = self._ids[: self._size]
+        self._matrix, self._ids = matrix, ids
+
+    def _store(self, rows, units: np.ndarray) -> None:
+        """Write unit vectors into the given row(s) of the matrix."""
+        self._matrix[rows] = units
+
+    def _score(self, unit: np.ndarray, rows: np.ndarray | None) -> np.ndarray:
+        """Cosine scores of unit against the given rows (None = every row)."""
+        matrix = self._matrix[: self._size] if rows is None else self._matrix[rows]
+        return cosine_one_to_many(unit, matrix, normalized=True)
+
+    # Hooks for subclasses that keep per-row side data
+    def _after_build(self) -> None:
+        pass
+
+    def _row_written(self, row: int) -> None:
+        pass
+
+    def _row_moved(self, src: int, dst: int) -> None:
+        pass
+
+    def _unit_chunks(self, items) -> tuple[list[int], list[np.ndarray]]:
+        """
+        Normalize streamed (id, vector) pairs into float32 blocks of
+        BUILD_CHUNK_ROWS rows, so per-row arrays never pile up for the
+        whole table.
+        """
+        ids, chunks, pending = [], [], []
+        for item_id, vector in items:
+            unit = self._normalize(vector)
+            if unit is None:
+                continue
+            ids.append(int(item_id))
+            pending.append(unit)
+            if len(pending) == BUILD_CHUNK_ROWS:
+                chunks.append(np.vstack(pending))
+                pending = []
+        if pending:
+            chunks.append(np.vstack(pending))
+        return ids, chunks
+
+    def build(self, items) -> None:
+        """Replace the index contents with an iterable of (id, vector) pairs."""
+        ids, chunks = self._unit_chunks(items)
+        with self._lock:
+            self._size = 0
+            self._rows = {}
+            self._reserve(len(ids))
+            start = 0
+            while chunks:
+                # Release each block once it is copied into the index
+                chunk = chunks.pop(0)
+                self._store(slice(start, start + len(chunk)), chunk)
+                start += len(chunk)
+            self._ids[: len(ids)] = ids
+            self._rows = {item_id: row for row, item_id in enumerate(ids)}
+            self._size = len(ids)
+            self._after_build()
+
+    def upsert(self, item_id: int, vector) -> None:
+        """Insert or replace a vector. Unusable vectors remove the id instead."""
+        unit = self._normalize(vector)
+        if unit is None:
+            self.remove(item_id)
+            return
+        with self._lock:
+            row = self._rows.get(item_id)
+            if row is None:
+                self._reserve(self._size + 1)
+                row = self._size
+                self._ids[row] = item_id
+                self._rows[item_id] = row
+                self._size += 1
+            self._store(row, unit)
+            self._row_written(row)
+
+    def remove(self, item_id: int) -> None:
+        """Drop an id, moving the last row into its slot to stay contiguous."""
+        with self._lock:
+            row = self._rows.pop(item_id, None)
+            if row is None:
+                return
+            last = self._size - 1
+            if row != last:
+                moved_id = int(self._ids[last])
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = moved_id
+                self._rows[moved_id] = row
+                self._row_moved(last, row)
+            self._size = last
+
+    def _candidate_rows(self, unit: np.ndarray, **params) -> np.ndarray | None:
+        """Rows to score for a query; None means every row."""
+        return None
+
+    def _allowed_rows(self, allowed) -> np.ndarray:
+        """Rows holding the given ids, in row order."""
+        rows = [self._rows[item_id] for item_id in allowed if item_id in self._rows]
+        return np.sort(np.array(rows, dtype=np.int64))
+
+    def search(
+        self,
+        query,
+        k: int = 20,
+        min_score: float | None = None,
+        exclude=None,
+        db: Session | None = None,
+        allowed=None,
+        **params,
+    ) -> list[tuple[int, float]]:
+        """
+        Return up to k (id, cosine score) pairs, best first.
+        Ids in exclude are never returned. When allowed is given (e.g. the
+        ids that passed SQL filters) only those ids are scored, exactly.
+        db is only used by database-backed indexes. Extra keyword params are
+        passed to the index type (e.g. nprobe for IVF).
+        """
+        unit = self._normalize(query)
+        if unit is None or k <= 0:
+            return []
+        exclude = set(exclude or ())
+        with self._lock:
+            if self._size == 0:
+                return []
+            if allowed is not None:
+                rows = self._allowed_rows(allowed)
+            else:
+                rows = self._candidate_rows(unit, **params)
+            scores = self._score(unit, rows)
+            ids = self._ids[: self._size].copy() if rows is None else self._ids[rows]
+        hits = [
+            (int(ids[i]), float(scores[i]))
+            for i in top_k(scores, k + len(exclude), min_score)
+            if int(ids[i]) not in exclude
+        ]
+        return hits[:k]
+
+
+class IVFIndex(VectorIndex):
+    """
+    Approximate index using spherical k-means partitions (IVF-Flat).
+    Below min_train_size rows it behaves exactly like VectorIndex. The
+    partitions are retrained once the index has doubled since the last
+    training, so incremental inserts do not degrade the bucket balance.
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+        nlist: int | None = None,
+        nprobe: int = 8,
+        min_train_size: int = 2048,
+        kmeans_iterations: int = 10,
+        seed: int = 0,
+    ):
+        super().__init__(dimensions)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.kmeans_iterations = kmeans_iterations
+        self._rng = np.random.default_rng(seed)
+        self._centroids: np.ndarray | None = None
+        self._assign = np.zeros(self._matrix.shape[0], dtype=np.int32)
+        self._trained_size = 0
+
+    def _reserve(self, capacity: int) -> None:
+        super()._reserve(capacity)
+        if self._assign.shape[0] < self._matrix.shape[0]:
+            assign = np.zeros(self._matrix.shape[0], dtype=np.int32)
+            assign[: self._size] = self._assign[: self._size]
+            self._assign = assign
+
+    def _assign_rows(self, matrix: np.ndarray, chunk: int = 16384) -> np.ndarray:
+        out = np.empty(matrix.shape[0], dtype=np.int32)
+        for start in range(0, matrix.shape[0], chunk):
+            block = matrix[start : start + chunk] @ self._centroids.T
+            out[start : start + chunk] = np.argmax(block, axis=1)
+        return out
+
+    def train(self) -> None:
+        """Fit partitions on the current rows and reassign every row."""
+        n = self._size
+        if n < self.min_train_size:
+            self._centroids = None
+            self._trained_size = 0
+            return
+        # A configured nlist above the row count would sample more centroids than rows
+        nlist = min(self.nlist or int(max(1, min(2 * np.sqrt(n), n // 39))), n)
+        sample_size = min(n, nlist * 32)
+        sample = self._matrix[:n][self._rng.choice(n, sample_size, replace=False)]
+        centroids = sample[self._rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            lists, starts = np.unique(assign[order], return_index=True)
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            centroids[lists] = normalize(sums)
+            # Reseed empty partitions from random sample points
+            empty = np.setdiff1d(np.arange(nlist), lists)
+            if empty.size:
+                centroids[empty] = sample[self._rng.choice(sample_size, empty.size, replace=False)]
+        self._centroids = centroids
+        self._assign[:n] = self._assign_rows(self._matrix[:n])
+        self._trained_size = n
+
+    def _after_build(self) -> None:
+        self.train()
+
+    def _row_written(self, row: int) -> None:
+        if self._centroids is None or self._size >= 2 * self._trained_size:
+            self.train()
+        else:
+            self._assign[row] = int(np.argmax(self._centroids @ self._matrix[row]))
+
+    def _row_moved(self, src: int, dst: int) -> None:
+        self._assign[dst] = self._assign[src]
+
+    def _candidate_rows(self, unit: np.ndarray, nprobe: int | None = None, **params) -> np.ndarray | None:
+        if self._centroids is None:
+            return None
+        nprobe = min(nprobe or self.nprobe, self._centroids.shape[0])
+        probe = top_k(self._centroids @ unit, nprobe)
+        return np.flatnonzero(np.isin(self._assign[: self._size], probe))
+
+
+class Int8Index(VectorIndex):
+    """
+    Exact-scan index over int8 scalar-quantized vectors with one float32
+    scale per row, roughly a quarter of the float32 footprint. The quantized
+    scan shortlists the top ``rerank`` rows, which are re-scored with their
+    full float vectors fetched through loader (by default from the database).
+    """
+
+    kind = "int8"
+    storage_dtype = np.int8
+
+    def __init__(
+        self,
+        model=None,
+        attr: str | None = None,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+        rerank: int = 200,
+        loader=None,
+    ):
+        super().__init__(dimensions)
+        self._scales = np.zeros(self._matrix.shape[0], dtype=np.float32)
+        self.rerank = rerank
+        self.model = model
+        self.column = getattr(model, attr) if model is not None else None
+        self._loader = loader or (self._load_from_db if model is not None else None)
+
+    def _reserve(self, capacity: int) -> None:
+        super()._reserve(capacity)
+        if self._scales.shape[0] < self._matrix.shape[0]:
+            scales = np.zeros(self._matrix.shape[0], dtype=np.float32)
+            scales[: self._size] = self._scales[: self._size]
+            self._scales = scales
+
+    def _store(self, rows, units: np.ndarray) -> None:
+        codes, scales = quantize_int8(units)
+        if isinstance(rows, int):
+            codes, scales = codes[0], scales[0]
+        self._matrix[rows] = codes
+        self._scales[rows] = scales
+
+    def _row_moved(self, src: int, dst: int) -> None:
+        self._scales[dst] = self._scales[src]
+
+    def _score(self, unit: np.ndarray, rows: np.ndarray | None) -> np.ndarray:
+        if rows is None:
+            return int8_one_to_many(unit, self._matrix[: self._size], self._scales[: self._size])
+        return int8_one_to_many(unit, self._matrix[rows], self._scales[rows])
+
+    def memory_bytes(self) -> int:
+        return super().memory_bytes() + self._size * self._scales.itemsize
+
+    def _load_from_db(self, ids: list[int], db: Session | None):
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            return db.query(self.model.id, self.column).filter(self.model.id.in_(ids)).all()
+        finally:
+            if own_session:
+                db.close()
+
+    def search(
+        self,
+        query,
+        k: int = 20,
+        min_score: float | None = None,
+        exclude=None,
+        db: Session | None = None,
+        rerank: int | None = None,
+        **params,
+    ) -> list[tuple[int, float]]:
+        unit = self._normalize(query)
+        if unit is None or k <= 0:
+            return []
+        shortlist = super().search(unit, k=max(k, rerank or self.rerank), exclude=exclude, **params)
+        if shortlist and self._loader is not None:
+            loaded = dict(self._loader([item_id for item_id, _ in shortlist], db))
+            matrix, valid = as_matrix([loaded.get(item_id) for item_id, _ in shortlist], self.dimensions)
+            exact = cosine_one_to_many(unit, matrix, normalized=True)
+            # Rows whose float vector could not be loaded keep their approximate score
+            scores = np.where(valid, exact, [score for _, score in shortlist])
+            shortlist = [(item_id, float(score)) for (item_id, _), score in zip(shortlist, scores)]
+            shortlist.sort(key=lambda hit: hit[1], reverse=True)
+        if min_score is not None:
+            shortlist = [(item_id, score) for item_id, score in shortlist if score > min_score]
+        return shortlist[:k]
+
+
+class MatryoshkaIndex(VectorIndex):
+    """
+    Two-stage index for Matryoshka (MRL) embeddings. Alongside the full
+    matrix it keeps the first prefix_dimensions components of every row,
+    renormalized. A query scans the prefix matrix, a fraction of the bytes
+    of a full scan, and only the top ``rerank`` rows are re-scored at full
+    dimension.
+    """
+
+    kind = "matryoshka"
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS, prefix_dimensions: int = 256, rerank: int = 200):
+        super().__init__(dimensions)
+        self.prefix_dimensions = min(prefix_dimensions, dimensions)
+        self.rerank = rerank
+        self._prefix = np.zeros((self._matrix.shape[0], self.prefix_dimensions), dtype=np.float32)
+
+    def _reserve(self, capacity: int) -> None:
+        super()._reserve(capacity)
+        if self._prefix.shape[0] < self._matrix.shape[0]:
+            prefix = np.zeros((self._matrix.shape[0], self.prefix_dimensions), dtype=np.float32)
+            prefix[: self._size] = self._prefix[: self._size]
+            self._prefix = prefix
+
+    def _store(self, rows, units: np.ndarray) -> None:
+        super()._store(rows, units)
+        self._prefix[rows] = truncate(units, self.prefix_dimensions)
+
+    def _row_moved(self, src: int, dst: int) -> None:
+        self._prefix[dst] = self._prefix[src]
+
+    def memory_bytes(self) -> int:
+        return super().memory_bytes() + self._size * self.prefix_dimensions * self._prefix.itemsize
+
+    def _candidate_rows(self, unit: np.ndarray, shortlist: int | None = None, **params) -> np.ndarray | None:
+        shortlist = shortlist or self.rerank
+        if shortlist >= self._size:
+            return None
+        scores = self._prefix[: self._size] @ truncate(unit, self.prefix_dimensions)
+        return np.sort(top_k(scores, shortlist))
+
+    def search(
+        self,
+        query,
+        k: int = 20,
+        min_score: float | None = None,
+        exclude=None,
+        db: Session | None = None,
+        rerank: int | None = None,
+        **params,
+    ) -> list[tuple[int, float]]:
+        # The shortlist must leave room for k hits after excluded ids are dropped
+        shortlist = max(rerank or self.rerank, k + len(exclude or ()))
+        return super().search(query, k=k, min_score=min_score, exclude=exclude, db=db, shortlist=shortlist, **params)
+
+
+class MappedVectorIndex(VectorIndex):
+    """
+    Exact index whose bulk rows live in a memory-mapped snapshot shared by
+    every worker. Rows written since the snapshot are replayed from the
+    store's delta log into the small in-process matrix inherited from
+    VectorIndex, and snapshot rows they supersede are masked out. Each
+    search first checks the store for a new generation or new deltas.
+    """
+
+    kind = "mmap"
+
+    def __init__(self, path: str, dimensions: int = EMBEDDING_DIMENSIONS, compact_after: int = 1024):
+        super().__init__(dimensions, initial_capacity=64)
+        self.store = VectorStore(path, dimensions)
+        self.compact_after = compact_after
+        self._base = np.zeros((0, dimensions), dtype=np.float32)
+        self._base_ids = np.zeros(0, dtype=np.int64)
+        self._dead = np.zeros(0, dtype=bool)
+        self._generation: str | None = None
+        self._pointer_key = None
+        self._offset = 0
+        self._delta_records = 0
+
+    def __len__(self) -> int:
+        return int((~self._dead).sum()) + self._size
+
+    def __contains__(self, item_id: int) -> bool:
+        row = self._base_row(item_id)
+        return item_id in self._rows or (row is not None and not self._dead[row])
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the live rows; the snapshot part is shared page cache."""
+        return super().memory_bytes() + int((~self._dead).sum()) * (self._base.shape[1] * 4 + 8)
+
+    def _base_row(self, item_id: int) -> int | None:
+        row = int(np.searchsorted(self._base_ids, item_id))
+        if row < self._base_ids.shape[0] and self._base_ids[row] == item_id:
+            return row
+        return None
+
+    def _attach(self, key, generation: str) -> None:
+        self._base, self._base_ids = self.store.open(generation)
+        self._dead = np.zeros(self._base.shape[0], dtype=bool)
+        VectorIndex.build(self, [])
+        self._generation, self._pointer_key = generation, key
+        self._offset = 0
+        self._delta_records = 0
+
+    def refresh(self) -> None:
+        """Switch to a newly published generation and replay new deltas."""
+        current = self.store.current()
+        if current is None:
+            return
+        key, generation = current
+        with self._lock:
+            if key != self._pointer_key:
+                self._attach(key, generation)
+            records, self._offset = self.store.read_deltas(self._generation, self._offset)
+            for record in records:
+                item_id = int(record["id"])
+                row = self._base_row(item_id)
+                if row is not None:
+                    self._dead[row] = True
+                if record["live"]:
+                    VectorIndex.upsert(self, item_id, record["vector"])
+                else:
+                    VectorIndex.remove(self, item_id)
+            self._delta_records += len(records)
+
+    def _publish(self, ids: np.ndarray, matrix: np.ndarray) -> None:
+        self.store.publish(ids, matrix)
+        self.refresh()
+
+    def build(self, items) -> None:
+        """
+        Publish a snapshot of items, unless another worker of this
+        deployment already did; then just map that one.
+        """
+        with self.store.lock():
+            published = self.store.published_at()
+            if published is not None and published >= _STARTED:
+                self.refresh()
+                return
+            ids, chunks = self._unit_chunks(items)
+            matrix = np.concatenate(chunks) if chunks else np.zeros((0, self.dimensions), dtype=np.float32)
+            del chunks
+            self._publish(np.array(ids, dtype=np.int64), matrix)
+
+    def _write(self, item_id: int, unit: np.ndarray | None) -> None:
+        with self.store.lock():
+            self.refresh()
+            if self._generation is None:
+                self._publish(np.zeros(0, dtype=np.int64), np.zeros((0, self.dimensions), dtype=np.float32))
+            self.store.append(self._generation, item_id, unit)
+            self.refresh()
+            if self._delta_records > max(self.compact_after, self._base.shape[0] // 10):
+                self.compact()
+
+    def upsert(self, item_id: int, vector) -> None:
+        unit = self._normalize(vector)
+        if unit is None:
+            self.remove(item_id)
+            return
+        self._write(item_id, unit)
+
+    def remove(self, item_id: int) -> None:
+        self.refresh()
+        if item_id in self:
+            self._write(item_id, None)
+
+    def compact(self) -> None:
+        """Fold the delta log into a new snapshot. Call with the store lock held."""
+        with self._lock:
+            live = ~self._dead
+            ids = np.concatenate([self._base_ids[live], self._ids[: self._size]])
+            matrix = np.vstack([self._base[live], self._matrix[: self._size]])
+        self._publish(ids, matrix)
+
+    def search(
+        self,
+        query,
+        k: int = 20,
+        min_score: float | None = None,
+        exclude=None,
+        db: Session | None = None,
+        allowed=None,
+        **params,
+    ) -> list[tuple[int, float]]:
+        unit = self._normalize(query)
+        if unit is None or k <= 0:
+            return []
+        self.refresh()
+        exclude = set(exclude or ())
+        allowed = None if allowed is None else set(allowed)
+        hits = []
+        with self._lock:
+            if self._base.shape[0]:
+                if allowed is None:
+                    rows = np.arange(self._base.shape[0])
+                    scores = cosine_one_to_many(unit, self._base, normalized=True)
+                else:
+                    wanted = np.fromiter(allowed, dtype=np.int64)
+                    rows = np.searchsorted(self._base_ids, wanted).clip(0, self._base.shape[0] - 1)
+                    rows = np.unique(rows[self._base_ids[rows] == wanted])
+                    scores = cosine_one_to_many(unit, self._base[rows], normalized=True)
+                scores[self._dead[rows]] = -1.0
+                for i in top_k(scores, k + len(exclude), min_score):
+                    item_id = int(self._base_ids[rows[i]])
+                    if scores[i] >= 0 and item_id not in exclude:
+                        hits.append((item_id, float(scores[i])))
+            hits += VectorIndex.search(self, unit, k=k, min_score=min_score, exclude=exclude, allowed=allowed)
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return hits[:k]
+
+
+class PgVectorIndex(VectorIndex):
+    """
+    Similarity search pushed into PostgreSQL with pgvector's cosine distance
+    operator, served by the partial HNSW indexes on active rows. Searches
+    restricted to ``allowed`` ids are ranked exactly instead, since HNSW
+    applies filters only to the rows its scan yields. The table is the
+    index, so build/upsert/remove are no-ops.
+    """
+
+    kind = "pgvector"
+    # pgvector's upper limit for hnsw.ef_search
+    MAX_EF_SEARCH = 1000
+
+    def __init__(self, model, attr: str, dimensions: int = EMBEDDING_DIMENSIONS, ef_search: int | None = None):
+        super().__init__(dimensions, initial_capacity=0)
+        self.model = model
+        self.column = getattr(model, attr)
+        self.ef_search = ef_search
+
+    def build(self, items) -> None:
+        pass
+
+    def upsert(self, item_id: int, vector) -> None:
+        pass
+
+    def remove(self, item_id: int) -> None:
+        pass
+
+    def search(
+        self,
+        query,
+        k: int = 20,
+        min_score: float | None = None,
+        exclude=None,
+        db: Session | None = None,
+        allowed=None,
+        **params,
+    ) -> list[tuple[int, float]]:
+        unit = self._normalize(query)
+        if unit is None or k <= 0 or (allowed is not None and not allowed):
+            return []
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            distance = self.column.cosine_distance(unit)
+            conditions = [self.model.is_active == True, self.column.isnot(None)]
+            if exclude:
+                conditions.append(~self.model.id.in_(list(exclude)))
+            if allowed is not None:
+                rows = self._search_allowed(db, distance, conditions, allowed, k)
+            else:
+                rows = self._search_hnsw(db, distance, conditions, k + len(exclude or ()), k, params)
+        finally:
+            if own_session:
+                db.close()
+        hits = [(int(item_id), max(0.0, min(1.0, 1.0 - float(d)))) for item_id, d in rows]
+        if min_score is not None:
+            hits = [(item_id, score) for item_id, score in hits if score > min_score]
+        return hits
+
+    def _search_hnsw(self, db: Session, distance, conditions, wanted: int, k: int, params: dict) -> list:
+        # An HNSW scan yields at most ef_search rows, and excluded rows are
+        # filtered out of those, so it must cover k plus the exclusions
+        ef_search = max(wanted, params.get("ef_search") or self.ef_search or 0)
+        db.execute(text(f"SET LOCAL hnsw.ef_search = {min(int(ef_search), self.MAX_EF_SEARCH)}"))
+        return db.query(self.model.id, distance).filter(*conditions).order_by(distance).limit(k).all()
+
+    def _search_allowed(self, db: Session, distance, conditions, allowed, k: int) -> list:
+        # The ids go as one array parameter, and the distances are computed
+        # in a materialized CTE that the planner cannot answer from the HNSW
+        # index, so every allowed row is ranked, not just the ones a
+        # filtered index scan happens to reach
+        ids = bindparam("allowed_ids", sorted(int(item_id) for item_id in allowed), type_=ARRAY(Integer))
+        scored = (
+            select(self.model.id.label("id"), distance.label("distance"))
+            .where(*conditions, self.model.id == any_(ids))
+            .cte("scored")
+            .prefix_with("MATERIALIZED")
+        )
+        return db.execute(select(scored.c.id, scored.c.distance).order_by(scored.c.distance).limit(k)).all()
+
+
+def make_index(entity: str, model, attr: str) -> VectorIndex:
+    """Create the index type configured for an entity ("candidates", "users", "projects")."""
+    default = "pgvector" if is_postgres else "exact"
+    kind = os.getenv(f"VECTOR_INDEX_{entity.upper()}", default).strip().lower()
+    if kind == "pgvector" and is_postgres:
+        return PgVectorIndex(model, attr, ef_search=int(os.getenv("PGVECTOR_EF_SEARCH", "0")) or None)
+    if kind == "int8":
+        return Int8Index(model, attr, rerank=int(os.getenv("INT8_RERANK", "200")))
+    if kind == "matryoshka":
+        return MatryoshkaIndex(
+            prefix_dimensions=int(os.getenv("MATRYOSHKA_DIMENSIONS", "256")),
+            rerank=int(os.getenv("MATRYOSHKA_RERANK", "200")),
+        )
+    if kind == "ivf":
+        return IVFIndex(
+            nlist=int(os.getenv("IVF_NLIST", "0")) or None,
+            nprobe=int(os.getenv("IVF_NPROBE", "8")),
+        )
+    if kind != "exact":
+        print(f"Vector index type '{kind}' is not available for {entity}, using exact scan")
+    store_dir = os.getenv("VECTOR_STORE_DIR")
+    if store_dir:
+        return MappedVectorIndex(os.path.join(store_dir, entity))
+    return VectorIndex()
+
+
+candidate_index = make_index("candidates", models.Candidate, "candidate_vector")
+user_index = make_index("users", models.User, "user_vector")
+project_index = make_index("projects", models.Project, "project_vector")
+
+# model -> (vector attribute, index); rows are indexed only while is_active
+_INDEXED_MODELS = {
+    models.Candidate: ("candidate_vector", candidate_index),
+    models.User: ("user_vector", user_index),
+    models.Project: ("project_vector", project_index),
+}
+
+
+def build_indexes(db: Session) -> None:
+    """Load every indexed table into its in-memory index."""
+    for model, (attr, index) in _INDEXED_MODELS.items():
+        if isinstance(index, PgVectorIndex):
+            print(f"{model.__tablename__} vectors are searched in PostgreSQL via pgvector")
+            continue
+        # Stream (id, vector) tuples; no ORM entities are built
+        rows = db.query(model.id, getattr(model, attr)).filter(model.is_active == True).yield_per(BUILD_CHUNK_ROWS)
+        index.build(rows)
+        print(f"Built {model.__tablename__} {index.kind} vector index with {len(index)} rows")
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_index_changes(session, flush_context):
+    pending = session.info.setdefault("vector_index_ops", [])
+    for obj in list(session.new) + list(session.dirty):
+        spec = _INDEXED_MODELS.get(type(obj))
+        if spec is None:
+            continue
+        attr, index = spec
+        vector = getattr(obj, attr) if obj.is_active is not False else None
+        pending.append((index, obj.id, vector))
+    for obj in session.deleted:
+        spec = _INDEXED_MODELS.get(type(obj))
+        if spec is not None:
+            pending.append((spec[1], obj.id, None))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_index_changes(session):
+    touched = set()
+    for index, item_id, vector in session.info.pop("vector_index_ops", []):
+        if vector is None:
+            index.remove(item_id)
+        else:
+            index.upsert(item_id, vector)
+        touched.add(index)
+    # Bump only once the changes are visible, see generations.py
+    for model, (_, index) in _INDEXED_MODELS.items():
+        if index in touched:
+            generations.bump(model.__tablename__)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_index_changes(session):
+    session.info.pop("vector_index_ops", None)
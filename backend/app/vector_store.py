@@ -0,0 +1,141 @@
+"""
+On-disk, memory-mapped vector store shared by every worker process.
+
+Layout of a store directory (one per indexed entity)::
+
+    CURRENT            name of the live generation, swapped with os.replace
+    lock               fcntl lock file serializing writers
+    gen-<ns>/
+        matrix.npy     (n, d) L2-normalized float32 rows, sorted by id
+        ids.npy        (n,) int64 row ids; row -> id manifest
+        deltas.bin     append-only log of upserts/removals since the snapshot
+
+Readers ``np.load(..., mmap_mode="r")`` the snapshot, so N workers share one
+page-cache copy instead of N private matrices. Writers append fixed-size
+records to the delta log; readers replay any records past the offset they
+have already seen. Compaction writes a new generation directory and flips
+``CURRENT`` in one atomic rename, so a reader either sees the old generation
+with its deltas or the new one, never a mix.
+"""
+import os
+import time
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+
+class VectorStore:
+    """Generation-versioned snapshot plus delta log for one index."""
+
+    def __init__(self, path: str, dimensions: int):
+        self.path = path
+        self.dimensions = dimensions
+        # live == 0 marks a removal; the vector is then ignored
+        self.record = np.dtype([("id", "<i8"), ("live", "<i4"), ("vector", "<f4", (dimensions,))])
+        os.makedirs(path, exist_ok=True)
+
+    @property
+    def pointer(self) -> str:
+        return os.path.join(self.path, "CURRENT")
+
+    @contextmanager
+    def lock(self):
+        """Exclusive cross-process lock for publishing and appending."""
+        with open(os.path.join(self.path, "lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def current(self) -> tuple[tuple, str] | None:
+        """
+        (key, generation) for the live generation, or None if nothing has
+        been published. key changes whenever CURRENT is replaced.
+        """
+        try:
+            st = os.stat(self.pointer)
+            with open(self.pointer) as f:
+                generation = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns), generation
+
+    def published_at(self) -> float | None:
+        """Wall-clock time CURRENT was last replaced."""
+        try:
+            return os.stat(self.pointer).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _deltas(self, generation: str) -> str:
+        return os.path.join(self.path, generation, "deltas.bin")
+
+    def open(self, generation: str) -> tuple[np.ndarray, np.ndarray]:
+        """Memory-map a generation's (matrix, ids)."""
+        directory = os.path.join(self.path, generation)
+        matrix = np.load(os.path.join(directory, "matrix.npy"), mmap_mode="r")
+        ids = np.load(os.path.join(directory, "ids.npy"), mmap_mode="r")
+        return matrix, ids
+
+    def publish(self, ids: np.ndarray, matrix: np.ndarray) -> str:
+        """
+        Write a new generation and make it current. Call with the lock held.
+        Rows are sorted by id so readers can look ids up with searchsorted.
+        """
+        order = np.argsort(ids, kind="stable")
+        generation = f"gen-{time.time_ns()}"
+        directory = os.path.join(self.path, generation)
+        os.makedirs(directory)
+        np.save(os.path.join(directory, "matrix.npy"), np.ascontiguousarray(matrix[order], dtype=np.float32))
+        np.save(os.path.join(directory, "ids.npy"), np.ascontiguousarray(ids[order], dtype=np.int64))
+        open(self._deltas(generation), "wb").close()
+        tmp = self.pointer + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(generation)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.pointer)
+        self._remove_old_generations(keep=generation)
+        return generation
+
+    def _remove_old_generations(self, keep: str) -> None:
+        # Keep the previous generation for readers that have not switched
+        # yet; already-mapped files stay readable after unlink on POSIX.
+        generations = sorted(name for name in os.listdir(self.path) if name.startswith("gen-"))
+        for name in generations[:-2]:
+            if name == keep:
+                continue
+            directory = os.path.join(self.path, name)
+            for filename in os.listdir(directory):
+                os.remove(os.path.join(directory, filename))
+            os.rmdir(directory)
+
+    def append(self, generation: str, item_id: int, vector: np.ndarray | None) -> None:
+        """Append one upsert (vector) or removal (None). Call with the lock held."""
+        record = np.zeros(1, dtype=self.record)
+        record["id"] = item_id
+        if vector is not None:
+            record["live"] = 1
+            record["vector"] = vector
+        with open(self._deltas(generation), "ab") as f:
+            f.write(record.tobytes())
+
+    def read_deltas(self, generation: str, offset: int) -> tuple[np.ndarray, int]:
+        """Complete delta records after byte offset, and the new offset."""
+        path = self._deltas(generation)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return np.zeros(0, dtype=self.record), offset
+        count = (size - offset) // self.record.itemsize
+        if count <= 0:
+            return np.zeros(0, dtype=self.record), offset
+        records = np.fromfile(path, dtype=self.record, count=count, offset=offset)
+        return records, offset + count * self.record.itemsize
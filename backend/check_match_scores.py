@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Check that the vectorized ProjectMatrix.score gives exactly the scores of
+calculate_match_score, and time both.
+
+By default generates synthetic users and projects with the awkward cases
+mixed in: empty and missing lists, duplicate terms, user terms no project
+uses, unknown complexities and vocabularies wider than one bitset word.
+With --from-db every user is checked against the stored active projects.
+Exits non-zero on any mismatch.
+
+    python check_match_scores.py --users 200 --projects 20000
+    python check_match_scores.py --from-db
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+# Add backend to path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app.match_scoring import ProjectMatrix, calculate_match_score
+
+COMPLEXITIES = ["beginner", "intermediate", "advanced", None, "expert"]
+
+
+def terms(rng: random.Random, pool: list, most: int):
+    """A random term list, sometimes None or empty, sometimes with duplicates."""
+    roll = rng.random()
+    if roll < 0.05:
+        return None
+    if roll < 0.1:
+        return []
+    chosen = rng.sample(pool, rng.randint(1, most))
+    if rng.random() < 0.1:
+        chosen += chosen[:1]
+    return chosen
+
+
+def synthetic(users: int, projects: int, vocabulary: int, seed: int):
+    rng = random.Random(seed)
+    pool = [f"term-{i}" for i in range(vocabulary)]
+    unused = [f"unused-{i}" for i in range(20)]  # never on a project
+    project_rows = [
+        SimpleNamespace(
+            id=i + 1,
+            owner_id=rng.randint(1, users),
+            skills=terms(rng, pool, 8),
+            languages=terms(rng, pool[:60], 4),
+            frameworks=terms(rng, pool[:120], 3),
+            complexity=rng.choice(COMPLEXITIES),
+        )
+        for i in range(projects)
+    ]
+    user_rows = [
+        SimpleNamespace(
+            id=i + 1,
+            skills=terms(rng, pool + unused, 12),
+            top_languages=terms(rng, pool[:60] + unused, 5),
+            top_frameworks=terms(rng, pool[:120], 5),
+        )
+        for i in range(users)
+    ]
+    return user_rows, project_rows
+
+
+def from_db():
+    from app.database import SessionLocal
+    from app import models
+
+    db = SessionLocal()
+    try:
+        user_rows = db.query(
+            models.User.id, models.User.skills, models.User.top_languages, models.User.top_frameworks
+        ).all()
+        project_rows = db.query(
+            models.Project.id,
+            models.Project.owner_id,
+            models.Project.skills,
+            models.Project.languages,
+            models.Project.frameworks,
+            models.Project.complexity,
+        ).filter(models.Project.is_active == True).all()
+        return user_rows, project_rows
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--projects", type=int, default=20000)
+    parser.add_argument("--vocabulary", type=int, default=300, help="distinct synthetic terms (>64 spans several bitset words)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--from-db", action="store_true", help="check stored users against stored active projects")
+    args = parser.parse_args()
+
+    if args.from_db:
+        users, projects = from_db()
+        print(f"🔍 Checking {len(users)} stored users against {len(projects)} active projects")
+    else:
+        users, projects = synthetic(args.users, args.projects, args.vocabulary, args.seed)
+        print(f"🔍 Checking {len(users)} synthetic users against {len(projects)} projects ({args.vocabulary} terms)")
+
+    matrix = ProjectMatrix()
+    started = time.perf_counter()
+    matrix.build(
+        (p.id, p.owner_id, p.skills, p.languages, p.frameworks, p.complexity) for p in projects
+    )
+    print(f"  → built matrix in {(time.perf_counter() - started) * 1000:.0f} ms ({len(matrix.terms)} terms)")
+
+    by_id = {p.id: p for p in projects}
+    mismatches, scalar_time, vector_time = 0, 0.0, 0.0
+    for user in users:
+        started = time.perf_counter()
+        ids, scores = matrix.score(user, exclude_owner=user.id)
+        vector_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        expected = {p.id: calculate_match_score(user, p)[0] for p in projects if p.owner_id != user.id}
+        scalar_time += time.perf_counter() - started
+
+        if set(ids.tolist()) != set(expected):
+            mismatches += 1
+            print(f"  ❌ user {user.id}: scored a different set of projects")
+            continue
+        reference = np.array([expected[project_id] for project_id in ids.tolist()])
+        wrong = np.flatnonzero(scores != reference)
+        if wrong.size:
+            mismatches += 1
+            project = by_id[int(ids[wrong[0]])]
+            print(f"  ❌ user {user.id}: {wrong.size} scores differ, e.g. project {project.id}: "
+                  f"{scores[wrong[0]]!r} != {reference[wrong[0]]!r}")
+
+    count = max(len(users), 1)
+    print(f"  → calculate_match_score: {scalar_time / count * 1000:.2f} ms per user")
+    print(f"  → ProjectMatrix.score:   {vector_time / count * 1000:.2f} ms per user")
+    if mismatches:
+        print(f"❌ {mismatches} users had mismatching scores")
+        sys.exit(1)
+    print("✅ Vectorized scores match calculate_match_score exactly")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Re-embed stored vectors that were not produced by the current Gemini model:
+rows embedded by the local fallback during an outage, and rows with no
+embedder tag or no vector. With --all every row is re-embedded, e.g. after
+changing EMBEDDING_DIMENSIONS.
+
+    python reembed_vectors.py
+    python reembed_vectors.py --entity candidates --batch-size 200
+    python reembed_vectors.py --all
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from sqlalchemy import or_
+
+# Add backend to path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app.database import SessionLocal
+from app import models
+from app.embeddings import breaker, refresh_embeddings
+from app.gemini_agent import EMBEDDING_MODEL
+
+ENTITIES = {
+    "candidates": models.Candidate,
+    "users": models.User,
+    "projects": models.Project,
+}
+
+
+def reembed(model, batch_size: int, everything: bool) -> int:
+    """Re-embed one table in id order, committing each batch. Returns rows updated."""
+    db = SessionLocal()
+    updated, last_id = 0, 0
+    try:
+        while True:
+            q = db.query(model).filter(model.id > last_id)
+            if not everything:
+                q = q.filter(or_(model.embedder.is_(None), model.embedder != EMBEDDING_MODEL))
+            rows = q.order_by(model.id).limit(batch_size).all()
+            if not rows:
+                break
+            refresh_embeddings(db, rows, force=everything)
+            remote = sum(1 for row in rows if row.embedder == EMBEDDING_MODEL)
+            db.commit()
+            updated += remote
+            last_id = rows[-1].id
+            print(f"  → {model.__tablename__}: {remote}/{len(rows)} rows embedded with {EMBEDDING_MODEL} (up to id {last_id})")
+            if remote == 0 and not breaker.allow():
+                print(f"  ⚠️  Gemini is unavailable (circuit {breaker.state}), stopping")
+                break
+    finally:
+        db.close()
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entity", choices=list(ENTITIES), action="append", help="table(s) to process (default: all)")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--all", action="store_true", help="re-embed every row, not just non-Gemini ones")
+    args = parser.parse_args()
+
+    for entity in args.entity or list(ENTITIES):
+        print(f"🔄 Re-embedding {entity}...")
+        count = reembed(ENTITIES[entity], args.batch_size, args.all)
+        print(f"✅ {count} {entity} now embedded with {EMBEDDING_MODEL}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,7 @@ sys.path.insert(0, str(backend_dir))
 
 from app.database import SessionLocal, engine
 from app import models
-from app.gemini_agent import embed_text
+from app.embeddings import refresh_embeddings
 
 def seed_candidates():
     """Seed database with dummy candidate data"""
@@ -92,18 +92,8 @@ def seed_candidates():
         # Add more candidates (keeping it shorter for quick seeding)
         print(f"📝 Creating {len(dummy_candidates)} candidate records...")
         
-        created_count = 0
+        candidates = []
         for candidate_data in dummy_candidates:
-            # Generate embedding from candidate summary and skills
-            embedding_text = f"{candidate_data['title']} {candidate_data['summary']} {' '.join(candidate_data['skills'])}"
-            print(f"  → Generating embedding for {candidate_data['name']}...")
-            candidate_vector = embed_text(embedding_text)
-            
-            if candidate_vector and len(candidate_vector) > 0:
-                print(f"    ✓ Generated {len(candidate_vector)}-dimensional embedding")
-            else:
-                print(f"    ⚠️  Warning: Empty embedding generated")
-            
             candidate = models.Candidate(
                 name=candidate_data["name"],
                 email=candidate_data["email"],
@@ -118,11 +108,21 @@ def seed_candidates():
                 certifications=candidate_data.get("certifications", []),
                 education=candidate_data["education"],
                 summary=candidate_data["summary"],
-                candidate_vector=candidate_vector,
                 is_active=True
             )
-            db.add(candidate)
-            created_count += 1
+            candidates.append(candidate)
+        
+        # Generate embeddings from candidate title, summary and skills in batches
+        print(f"  → Generating embeddings for {len(candidates)} candidates...")
+        refresh_embeddings(db, candidates)
+        for candidate in candidates:
+            if candidate.candidate_vector is not None:
+                print(f"    ✓ {candidate.name}: {len(candidate.candidate_vector)}-dimensional embedding")
+            else:
+                print(f"    ⚠️  Warning: Empty embedding generated for {candidate.name}")
+        
+        db.add_all(candidates)
+        created_count = len(candidates)
         
         db.commit()
         print(f"\n✅ Successfully seeded {created_count} candidates!")
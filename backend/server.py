@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 from typing import List, Literal, Optional, Any, Dict
 import json
 from .gemini_client import GeminiClient
+from .app.vector import as_matrix, cosine_one_to_many
 
 
 app = FastAPI(title="CollabFoundry Inference API", docs_url="/docs")
@@ -68,27 +69,16 @@ def safe_json_loads(s: str) -> Any:
 		raise HTTPException(status_code=502, detail="Upstream returned non-JSON response")
 
 
-def compute_cosine_similarity(a: List[float], b: List[float]) -> float:
-	if not a or not b or len(a) != len(b):
-		return 0.0
-	sum_aa = 0.0
-	sum_bb = 0.0
-	sum_ab = 0.0
-	for x, y in zip(a, b):
-		sum_ab += x * y
-		sum_aa += x * x
-		sum_bb += y * y
-	if sum_aa == 0.0 or sum_bb == 0.0:
-		return 0.0
-	return max(0.0, min(1.0, sum_ab / ((sum_aa ** 0.5) * (sum_bb ** 0.5))))
-
-
 def local_match(payload: MatchInput) -> List[Dict[str, Any]]:
 	project = payload.project_embedding
 	users = payload.user_embeddings
+	if not users:
+		return []
+	matrix, _ = as_matrix([u.embedding for u in users], len(project) or 1)
+	scores = cosine_one_to_many(project, matrix, normalized=True)
 	scored = [
-		{"user_id": u.id, "match_score": compute_cosine_similarity(project, u.embedding)}
-		for u in users
+		{"user_id": u.id, "match_score": float(score)}
+		for u, score in zip(users, scores)
 	]
 	return sorted(scored, key=lambda x: x["match_score"], reverse=True)
 